@@ -0,0 +1,82 @@
+"""无界面的常驻监听模式，不导入任何GUI模块
+
+用法：
+    python daemon.py [-c config.json] [-l helper.log]
+
+配置文件为JSON格式，键为 helper/config.py 中的大写配置项，修改后自动重新加载。
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+from loguru import logger
+
+# 只导入配置模块，启动时先读取配置文件，再导入会在导入时创建缓存的网络相关模块
+from helper import config as CONF
+
+
+def log_changes(changed: dict, startup: bool = False):
+    for name, value in changed.items():
+        if not startup and name in CONF.RESTART_REQUIRED:
+            logger.warning("配置已修改，重启后生效: {}={}", name, value)
+        else:
+            logger.info("配置已更新: {}={}", name, value)
+
+
+def reload_config(path: Path):
+    try:
+        changed = CONF.load_config(path)
+    except Exception:
+        logger.exception("配置文件加载失败: {}", path)
+        return
+    log_changes(changed)
+
+
+async def watch_config(path: Path):
+    """配置文件修改后重新加载"""
+
+    mtime = path.stat().st_mtime if path.exists() else 0
+    while True:
+        await asyncio.sleep(CONF.CONFIG_RELOAD_INTERVAL)
+        current = path.stat().st_mtime if path.exists() else 0
+        if current != mtime:
+            mtime = current
+            if current:
+                reload_config(path)
+
+
+async def main(config_file: Path):
+    from helper.supervisor import Supervisor
+
+    watcher = asyncio.create_task(watch_config(config_file))
+    try:
+        await Supervisor(exit_when_empty=False).run()
+    finally:
+        watcher.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LOL大乱斗助手无界面模式")
+    parser.add_argument("-c", "--config", type=Path, default=CONF.CONFIG_FILE)
+    parser.add_argument("-l", "--log", type=Path, default=None)
+    args = parser.parse_args()
+
+    # 配置文件可能修改LOG_FILE，先读取配置，添加日志文件后再输出加载结果
+    changed, error = {}, None
+    if args.config.exists():
+        try:
+            changed = CONF.load_config(args.config)
+        except Exception as e:
+            error = e
+
+    logger.remove()
+    if sys.stdout is not None:
+        logger.add(sys.stdout, level="WARNING")
+    logger.add(args.log or CONF.LOG_FILE, rotation="10 MB", retention=5, encoding="utf8")
+    logger.info("启动无界面模式 {}", CONF.VERSION)
+    if error is not None:
+        logger.opt(exception=error).error("配置文件加载失败: {}", args.config)
+    log_changes(changed, startup=True)
+    asyncio.run(main(args.config))
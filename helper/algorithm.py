@@ -1,5 +1,5 @@
 from time import time
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
 TIME_LIMIT = 60 * 60 * 5  # 5 hours
 
@@ -47,3 +47,18 @@ def analysis_match_list(matches: List[dict], game_mode: str) -> Tuple[float, flo
             stop = True
 
     return (kills + assists) / (deaths or 1), damages / total, repeats, win / len(matches)
+
+
+def analysis_match_lists(
+    histories: Dict[str, List[dict]], game_mode: str
+) -> Dict[str, Tuple[float, float, int, float]]:
+    """批量计算多名召唤师的战绩，用于整支队伍的分析
+
+    Args:
+        histories (Dict[str, List[dict]]): puuid -> 比赛记录列表
+        game_mode (str): 游戏模式
+    Returns:
+        Dict[str, Tuple[float, float, int, float]]: puuid -> kda、分均伤害、连胜/连败场次、胜率
+    """
+
+    return {puuid: analysis_match_list(matches, game_mode) for puuid, matches in histories.items()}
@@ -0,0 +1,249 @@
+import json
+import os
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from time import monotonic, time
+from typing import Any, Hashable, Optional
+
+from loguru import logger
+
+from . import config as CONF
+
+
+class TTLCache:
+    """带过期时间的内存缓存
+
+    所有项的过期时间相同，按写入顺序排列即按过期时间排列，写入时从头部删除已过期的项，
+    长时间运行时缓存大小不超过过期时间内写入的数量。
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """获取缓存值，不存在或已过期时返回None"""
+
+        if (item := self._data.get(key)) is None:
+            return None
+        expire, value = item
+        if expire < monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        now = monotonic()
+        self._data[key] = (now + self.ttl, value)
+        self._data.move_to_end(key)
+        # 刚写入的项未过期，循环不会清空字典
+        while next(iter(self._data.values()))[0] < now:
+            self._data.popitem(last=False)
+
+    def discard(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class PersistentCache:
+    """保存到JSON文件的带过期时间的缓存，过期时间使用系统时间，重启后仍然有效
+
+    首次使用时读取文件，修改后调用save写回。
+
+    Args:
+        path: 缓存文件，为None时只保存在内存中
+        ttl: 过期时间(秒)
+    """
+
+    def __init__(self, path: Optional[Path], ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self.dirty = False
+        self._data: Optional[dict[str, tuple[float, Any]]] = None
+
+    @property
+    def data(self) -> dict[str, tuple[float, Any]]:
+        if self._data is None:
+            self._data = {}
+            if self.path is not None and self.path.is_file():
+                try:
+                    items = json.loads(self.path.read_text(encoding="utf8"))
+                except (OSError, ValueError):
+                    logger.warning("缓存文件读取失败: {}", self.path)
+                    items = {}
+                now = time()
+                self._data = {key: tuple(item) for key, item in items.items() if item[0] > now}
+        return self._data
+
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存值，不存在或已过期时返回None"""
+
+        if (item := self.data.get(key)) is None:
+            return None
+        expire, value = item
+        if expire < time():
+            del self.data[key]
+            self.dirty = True
+            return None
+        return value
+
+    def set(self, key: str, value: Any):
+        self.data[key] = (time() + self.ttl, value)
+        self.dirty = True
+
+    def discard(self, key: str):
+        if self.data.pop(key, None) is not None:
+            self.dirty = True
+
+    def clear(self):
+        self.data.clear()
+        self.dirty = True
+
+    def save(self):
+        """有修改时写回文件"""
+
+        if not self.dirty or self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_suffix(".tmp")
+        temp.write_text(json.dumps(self.data, ensure_ascii=False), encoding="utf8")
+        os.replace(temp, self.path)
+        self.dirty = False
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+class MatchDetailCache:
+    """已结束比赛的详情缓存，比赛结束后详情不再变化
+
+    磁盘上每场比赛一个以gameId命名的zlib压缩文件，总大小超出上限时删除最久未使用的文件，
+    内存中保留最近使用的少量比赛作为热数据。
+
+    Args:
+        directory: 缓存目录
+        max_bytes: 磁盘缓存大小上限(压缩后)
+        hot_size: 内存中保留的比赛数量
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, hot_size: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hot_size = hot_size
+        self.hot: OrderedDict[int, dict] = OrderedDict()
+        self._index: Optional[OrderedDict[int, int]] = None  # gameId -> 文件大小，按使用时间排序
+        self.total_bytes = 0
+        self.hot_hits = self.disk_hits = self.misses = 0
+        self.raw_bytes = self.stored_bytes = self.served_bytes = 0
+
+    def _path(self, game_id: int) -> Path:
+        return self.directory / f"{game_id}.json.z"
+
+    @property
+    def index(self) -> OrderedDict[int, int]:
+        """首次使用时按修改时间扫描缓存目录"""
+
+        if self._index is None:
+            self._index = OrderedDict()
+            if self.directory.is_dir():
+                files = sorted(
+                    (entry.stat().st_mtime, int(entry.name.split(".")[0]), entry.stat().st_size)
+                    for entry in os.scandir(self.directory)
+                    if entry.name.endswith(".json.z")
+                )
+                for _, game_id, size in files:
+                    self._index[game_id] = size
+            self.total_bytes = sum(self._index.values())
+        return self._index
+
+    def _remember(self, game_id: int, detail: dict):
+        self.hot[game_id] = detail
+        self.hot.move_to_end(game_id)
+        while len(self.hot) > self.hot_size:
+            self.hot.popitem(last=False)
+
+    def get(self, game_id: int) -> Optional[dict]:
+        game_id = int(game_id)
+        if (detail := self.hot.get(game_id)) is not None:
+            self.hot.move_to_end(game_id)
+            self.hot_hits += 1
+            return detail
+        if game_id not in self.index:
+            self.misses += 1
+            return None
+
+        path = self._path(game_id)
+        try:
+            raw = zlib.decompress(path.read_bytes())
+        except (OSError, zlib.error):
+            self.total_bytes -= self.index.pop(game_id)
+            self.misses += 1
+            return None
+        # 更新修改时间，重启后仍能按使用时间淘汰
+        os.utime(path)
+        self.index.move_to_end(game_id)
+        self.disk_hits += 1
+        self.served_bytes += len(raw)
+        detail = json.loads(raw)
+        self._remember(game_id, detail)
+        return detail
+
+    def set(self, game_id: int, detail: dict):
+        game_id = int(game_id)
+        raw = json.dumps(detail, ensure_ascii=False, separators=(",", ":")).encode("utf8")
+        data = zlib.compress(raw)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._path(game_id).write_bytes(data)
+
+        index = self.index
+        self.total_bytes += len(data) - index.pop(game_id, 0)
+        index[game_id] = len(data)
+        self.raw_bytes += len(raw)
+        self.stored_bytes += len(data)
+        self._remember(game_id, detail)
+
+        while self.total_bytes > self.max_bytes and len(index) > 1:
+            old_id, size = index.popitem(last=False)
+            self._path(old_id).unlink(missing_ok=True)
+            self.total_bytes -= size
+
+    def stats(self) -> dict:
+        """命中率、压缩节省的空间和命中时避免请求的数据量"""
+
+        total = self.hot_hits + self.disk_hits + self.misses
+        return {
+            "hot_hits": self.hot_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hot_hits + self.disk_hits) / (total or 1), 3),
+            "compression_saved_bytes": self.raw_bytes - self.stored_bytes,
+            "served_bytes": self.served_bytes,
+            "disk_bytes": self.total_bytes,
+        }
+
+    def report(self):
+        if self.hot_hits + self.disk_hits + self.misses:
+            logger.info("比赛详情缓存: {}", self.stats())
+
+
+# 所有客户端共享的缓存
+CHAMPION_CACHE: dict[int, str] = {}  # 英雄id -> 英雄名称，游戏版本内不变
+# 以下缓存的键均为puuid
+HISTORY_CACHE = TTLCache(CONF.HISTORY_CACHE_TTL)
+SUMMONER_CACHE = PersistentCache(CONF.SUMMONER_CACHE_FILE, CONF.SUMMONER_CACHE_TTL)
+# 键为gameId
+MATCH_DETAIL_CACHE = MatchDetailCache(
+    CONF.MATCH_CACHE_DIR, CONF.MATCH_CACHE_MAX_BYTES, CONF.MATCH_CACHE_HOT_SIZE
+)
@@ -11,10 +11,29 @@ else:
 
 AUTO_CONFIRM = True
 AUTO_ANALYSIS = True
-AUTO_PICKS = []
 AUTO_PICK_SWITCH = True
 AUTO_PICK_CACHE = ROOT / "champions.json"
 
+# 房间/匹配阶段预取队伍成员战绩
+PREFETCH = True
+PREFETCH_CONCURRENCY = 4
+HISTORY_CACHE_TTL = 60 * 10  # 10 minutes
+SUMMONER_CACHE_TTL = 60 * 60 * 24 * 7  # 7 days
+SUMMONER_CACHE_FILE = ROOT / "cache" / "summoners.json"
+SUMMONER_BATCH_WINDOW = 0.02  # 合并召唤师查询的等待时间(秒)
+# 已结束比赛的详情缓存
+MATCH_CACHE_DIR = ROOT / "cache" / "matches"
+MATCH_CACHE_MAX_BYTES = 64 * 1024 * 1024
+MATCH_CACHE_HOT_SIZE = 32
+
+# 请求调度：并发上限、令牌桶初始速率(次/秒)和容量，速率在上下限之间根据延迟自适应
+REQUEST_CONCURRENCY = 8
+REQUEST_RATE = 20.0
+REQUEST_BURST = 10
+REQUEST_RATE_MIN = 2.0
+REQUEST_RATE_MAX = 100.0
+REQUEST_TARGET_LATENCY = 1.0
+
 SAVE_MATCH = False
 MATCH_FILE = ROOT / "matches.txt"
 # fmt: off
@@ -27,11 +46,109 @@ SAVE_ITEM = {
 }
 # fmt: on
 
-if AUTO_PICK_CACHE.exists():
-    with AUTO_PICK_CACHE.open("r", encoding="utf8") as f:
-        AUTO_PICKS = list(json.load(f)["selected"].keys())
+# 记录客户端WebSocket消息和HTTP响应，用于scripts/replay.py回放
+RECORD_SESSION = False
+RECORD_DIR = ROOT / "records"
+
+# 记录英雄选择等阶段各操作的耗时，进入游戏或客户端关闭时保存为Chrome trace格式
+TRACE = False
+TRACE_DIR = ROOT / "traces"
+
+# 本地只读战绩接口，供悬浮窗等工具读取已分析的数据
+STATS_API = False
+STATS_API_HOST = "127.0.0.1"
+STATS_API_PORT = 8765
+
+# 无界面模式的配置文件与日志文件
+CONFIG_FILE = ROOT / "config.json"
+CONFIG_RELOAD_INTERVAL = 2.0  # 检查配置文件修改的间隔(秒)
+LOG_FILE = ROOT / "helper.log"
 
 PROCESS_NAME = "LeagueClientUx.exe"
+DISCOVER_INTERVAL = 5.0  # 查找新客户端的间隔(秒)
+
+# 启动时创建缓存、调度器和接口服务后不再读取的配置项，运行中修改需要重启才能生效
+RESTART_REQUIRED = frozenset(
+    {
+        "AUTO_PICK_CACHE",
+        "HISTORY_CACHE_TTL",
+        "SUMMONER_CACHE_TTL",
+        "SUMMONER_CACHE_FILE",
+        "MATCH_CACHE_DIR",
+        "MATCH_CACHE_MAX_BYTES",
+        "MATCH_CACHE_HOT_SIZE",
+        "REQUEST_CONCURRENCY",
+        "REQUEST_RATE",
+        "REQUEST_BURST",
+        "REQUEST_RATE_MIN",
+        "REQUEST_RATE_MAX",
+        "STATS_API",
+        "STATS_API_HOST",
+        "STATS_API_PORT",
+        "CONFIG_FILE",
+        "LOG_FILE",
+    }
+)
+
+
+def __getattr__(name: str):
+    """首次访问AUTO_PICKS时才读取英雄列表文件，避免导入配置时读取文件"""
+
+    if name == "AUTO_PICKS":
+        auto_picks = []
+        if AUTO_PICK_CACHE.exists():
+            with AUTO_PICK_CACHE.open("r", encoding="utf8") as f:
+                auto_picks = list(json.load(f)["selected"].keys())
+        globals()["AUTO_PICKS"] = auto_picks
+        return auto_picks
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _convert(name: str, value, current):
+    """将配置文件中的值转换为与当前配置项相同的类型，类型不符时抛出TypeError"""
+
+    if isinstance(current, Path) and isinstance(value, str):
+        return Path(value)
+    # bool是int的子类，需要单独判断
+    if isinstance(current, bool) or isinstance(value, bool):
+        if isinstance(current, bool) and isinstance(value, bool):
+            return value
+    elif isinstance(current, float) and isinstance(value, (int, float)):
+        return float(value)
+    elif isinstance(current, (int, str, list)) and type(value) is type(current):
+        return value
+    expect = "path" if isinstance(current, Path) else type(current).__name__
+    raise TypeError(f"Invalid config: {name}={value!r}, expect {expect}")
+
+
+def load_config(path: Path) -> dict:
+    """读取JSON配置文件并覆盖同名配置项，返回实际修改的配置项
+
+    所有配置项校验通过后才会修改，任一配置项名称或类型错误时不修改任何配置。
+
+    Args:
+        path: 配置文件，键为本模块中的大写配置项名称，如{"AUTO_CONFIRM": false}
+    Returns:
+        changed: 值发生变化的配置项
+    """
+    with path.open("r", encoding="utf8") as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise TypeError("Config file must be a JSON object")
+
+    module = sys.modules[__name__]
+    values = {}
+    for name, value in config.items():
+        if not name.isupper() or not hasattr(module, name):
+            raise KeyError(f"Unknown config: {name}")
+        values[name] = _convert(name, value, getattr(module, name))
+
+    changed = {}
+    for name, value in values.items():
+        if getattr(module, name) != value:
+            setattr(module, name, value)
+            changed[name] = value
+    return changed
 
 
 class GameMode(StrEnum):
@@ -47,6 +164,7 @@ class Route(StrEnum):
     # 选人信息
     AddFriend = "/lol-chat/v1/friend-requests"  # POST
     AcceptGame = "/lol-matchmaking/v1/ready-check/accept"  # post
+    ReadyCheck = "/lol-matchmaking/v1/ready-check"
     BlueEssence = "/lol-inventory/v1/wallet/lol_blue_essence"
     BpChampion = "/lol-champ-select/v1/session/actions/{actionId}"  # patch
     SwapChampion = "/lol-champ-select/v1/session/bench/swap/{championId}"
@@ -73,3 +191,7 @@ class Route(StrEnum):
     ProfileIcon = "/lol-game-data/assets/v1/profile-icons/{id}.jpg"
     RankedStats = "/lol-ranked/v1/ranked-stats/{puuid}"
     Summoners = "/lol-summoner/v2/summoners?ids={ids}"
+    # 批量查询召唤师  post: [puuid, ...]
+    SummonersByPuuid = "/lol-summoner/v2/summoners/puuid"
+    # 房间成员
+    LobbyMembers = "/lol-lobby/v2/lobby/members"
@@ -1,4 +1,3 @@
-import asyncio
 import json
 from threading import Thread
 from tkinter import BooleanVar, Text, Tk, Toplevel, ttk
@@ -7,7 +6,6 @@ from typing import Callable
 from loguru import logger
 
 from helper.exceptions import ClientNotStart
-from helper.lcu import LcuClient
 
 from . import config as CONF
 
@@ -72,6 +70,10 @@ class AutoPick(Toplevel):
         # 第一次使用加载英雄列表
         if not CONF.AUTO_PICK_CACHE.exists():
             logger.info("未找到英雄列表文件，正在下载...")
+            import asyncio
+
+            from helper.lcu import LcuClient
+
             client = LcuClient()
             champions = asyncio.run(client.get(CONF.Route.AllChampions))
             self.champions = {
@@ -207,6 +209,10 @@ class UI(Tk):
             lambda msg: text.insert("end", msg) or text.see("end"),
             format="{time:HH:mm:ss} {message}",
         )
+        # 访问CONF.AUTO_PICKS会读取英雄列表文件，在窗口显示后再输出设置
+        self.after_idle(self.log_settings)
+
+    def log_settings(self):
         logger.info("自动确认：{}", "开启" if CONF.AUTO_CONFIRM else "关闭")
         logger.info("自动选人：{}", "开启" if CONF.AUTO_PICKS else "关闭")
         logger.info("战绩分析：{}", "开启" if CONF.AUTO_ANALYSIS else "关闭")
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import threading
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+from . import config as CONF
+
+
+class MatchIndex:
+    """CONF.MATCH_FILE 的puuid索引，用于在英雄选择时查找曾经同队的玩家
+
+    索引文件与记录文件同名并以.idx结尾，每行为记录文件中一局游戏的JSON摘要：
+        [起始位置, 结束位置, {puuid: [[创建时间, 游戏模式, 是否胜利], ...]}]
+    内存中按玩家汇总同队次数和各模式按创建时间去重的胜负，查询时不读取记录文件。
+    写入记录时同步追加索引；加载时若记录文件被其他程序追加则只补充新增部分，
+    若记录文件被截断、替换或索引格式不同则重建索引。
+    """
+
+    def __init__(self):
+        self.path: Optional[Path] = None
+        self.offsets: dict[str, list[int]] = {}
+        # puuid -> 游戏模式 -> {创建时间: 是否胜利}
+        self.games: dict[str, dict[str, dict[int, bool]]] = {}
+        self.end = 0
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self) -> Path:
+        return CONF.MATCH_FILE.with_name(CONF.MATCH_FILE.name + ".idx")
+
+    @staticmethod
+    def _digest(record: list) -> dict[str, list]:
+        """记录中每名玩家近期比赛的创建时间、模式和胜负"""
+
+        return {
+            member["puuid"]: [
+                [match["creation"], match.get("mode", ""), bool(match.get("win", False))]
+                for match in member["matches"]
+            ]
+            for member in record
+        }
+
+    def _add(self, start: int, end: int, digest: dict[str, list]):
+        for puuid, matches in digest.items():
+            self.offsets.setdefault(puuid, []).append(start)
+            modes = self.games.setdefault(puuid, {})
+            for creation, mode, win in matches:
+                # 同一玩家多次同队时近期比赛会重叠
+                modes.setdefault(mode, {})[creation] = win
+        self.end = end
+
+    def _reset(self):
+        self.offsets = {}
+        self.games = {}
+        self.end = 0
+
+    def _load(self):
+        self.path = None
+        self._reset()
+        path = CONF.MATCH_FILE
+        size = path.stat().st_size if path.is_file() else 0
+        if self.index_path.is_file():
+            try:
+                with self.index_path.open(encoding="utf8") as f:
+                    for line in f:
+                        start, end, digest = json.loads(line)
+                        self._add(start, end, digest)
+            except (ValueError, TypeError):
+                logger.info("比赛记录索引格式已变化，重建索引")
+                self._reset()
+                self.index_path.unlink()
+        if self.end > size or (self.end and not self._ends_with_newline(path)):
+            logger.info("比赛记录文件已变化，重建索引")
+            self._reset()
+            self.index_path.unlink(missing_ok=True)
+        if self.end < size:
+            self._scan(path, size)
+        self.path = path
+
+    def _ends_with_newline(self, path: Path) -> bool:
+        with path.open("rb") as f:
+            f.seek(self.end - 1)
+            return f.read(1) == b"\n"
+
+    def _scan(self, path: Path, size: int):
+        """索引记录文件中未索引的部分"""
+
+        lines = []
+        with path.open("rb") as f:
+            f.seek(self.end)
+            while (start := f.tell()) < size and (line := f.readline()).endswith(b"\n"):
+                try:
+                    digest = self._digest(json.loads(line))
+                except (ValueError, TypeError, KeyError, AttributeError):
+                    # 跳过格式错误的行，索引中记录为空摘要，之后加载时不再重复解析
+                    logger.warning("比赛记录第{}字节处的行格式错误，已跳过", start)
+                    digest = {}
+                self._add(start, f.tell(), digest)
+                lines.append(json.dumps([start, f.tell(), digest]) + "\n")
+        with self.index_path.open("a", encoding="utf8") as f:
+            f.writelines(lines)
+        logger.info("已索引{}条比赛记录", len(lines))
+
+    def _ensure(self):
+        if self.path == CONF.MATCH_FILE:
+            return
+        with self._lock:
+            if self.path != CONF.MATCH_FILE:
+                self._load()
+
+    async def ready(self):
+        """在线程中加载索引，避免首次查询时阻塞事件循环"""
+
+        if self.path != CONF.MATCH_FILE:
+            await asyncio.to_thread(self._ensure)
+
+    def append(self, record: list):
+        """在记录文件末尾写入一局游戏并更新索引"""
+
+        self._ensure()
+        line = json.dumps(record).encode() + b"\n"
+        with CONF.MATCH_FILE.open("ab") as f:
+            start = f.tell()
+            f.write(line)
+        digest = self._digest(record)
+        self._add(start, start + len(line), digest)
+        with self.index_path.open("a", encoding="utf8") as f:
+            f.write(json.dumps([start, self.end, digest]) + "\n")
+
+    def lookup(self, puuid: str) -> list[dict]:
+        """返回指定玩家所在的每局记录中该玩家的近期比赛，需要读取记录文件"""
+
+        self._ensure()
+        results = []
+        if not (offsets := self.offsets.get(puuid)):
+            return results
+        with CONF.MATCH_FILE.open("rb") as f:
+            for start in offsets:
+                f.seek(start)
+                for member in json.loads(f.readline()):
+                    if member["puuid"] == puuid:
+                        results.append(member)
+        return results
+
+    def summary(self, puuid: str, game_mode: str) -> Optional[tuple[int, int, float]]:
+        """曾同队次数、记录中该模式的比赛场数和胜率，没有记录或索引未加载时返回None"""
+
+        if self.path != CONF.MATCH_FILE or (offsets := self.offsets.get(puuid)) is None:
+            return None
+        games = self.games[puuid].get(game_mode, {})
+        return len(offsets), len(games), sum(games.values()) / (len(games) or 1)
+
+
+MATCH_INDEX = MatchIndex()
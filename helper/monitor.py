@@ -0,0 +1,82 @@
+from time import strftime
+
+from httpx import HTTPStatusError
+from loguru import logger
+from websockets import connect
+from websockets.exceptions import ConnectionClosedError
+
+from . import config as CONF
+from .cache import MATCH_DETAIL_CACHE
+from .exceptions import GameEnd, GameStart
+from .lcu import SSL_CONTEXT, LcuClient
+from .match_index import MATCH_INDEX
+from .recorder import Recorder
+
+
+async def monitor_client(client: LcuClient):
+    url = client.base_url.replace("https", "wss")
+    if CONF.RECORD_SESSION and client.recorder is None:
+        client.recorder = Recorder.create(CONF.RECORD_DIR, client.port)
+        logger.info("记录客户端消息至: {}", client.recorder.path)
+        # 记录当前召唤师信息，回放时用于初始化客户端
+        await client.get_summoner_info()
+    async with connect(url, ssl=SSL_CONTEXT, open_timeout=3) as socket:
+        logger.info("启动客户端监听")
+        await socket.send(b'[5, "OnJsonApiEvent_lol-gameflow_v1_gameflow-phase"]')
+        await socket.send(b'[5, "OnJsonApiEvent_lol-champ-select_v1_session"]')
+        await socket.send(b'[5, "OnJsonApiEvent_lol-matchmaking_v1_ready-check"]')
+        while True:
+            if resp := await socket.recv():
+                if client.recorder is not None:
+                    client.recorder.record_frame(resp)
+                await client.handle_ws_response(resp)
+
+
+def dump_trace(client: LcuClient):
+    if not client.tracer.events:
+        return
+    path = CONF.TRACE_DIR / f"{strftime('%Y%m%d-%H%M%S')}-{client.port}.json"
+    count = client.tracer.dump(path)
+    logger.info("保存{}个追踪区间至: {}", count, path)
+
+
+def report_stats(client: LcuClient):
+    client.scheduler.log_stats()
+    MATCH_DETAIL_CACHE.report()
+
+
+async def run_client(client: LcuClient):
+    """持续监听客户端，对局开始、结束或连接断开后重新连接，客户端关闭时返回"""
+
+    # 提前在线程中加载比赛记录索引，英雄选择时无需等待
+    client.create_task(MATCH_INDEX.ready())
+    try:
+        await _run_client(client)
+    finally:
+        dump_trace(client)
+        report_stats(client)
+        if client.recorder is not None:
+            client.recorder.close()
+            client.recorder = None
+
+
+async def _run_client(client: LcuClient):
+    while True:
+        try:
+            await monitor_client(client)
+        except ConnectionClosedError:
+            logger.info("客户端会话关闭, 正在重新连接...")
+        except GameStart:
+            logger.info("对局已启动")
+            dump_trace(client)
+            report_stats(client)
+        except GameEnd:
+            logger.info("对局已结束")
+        except HTTPStatusError:
+            logger.exception("游戏状态错误")
+        except ConnectionRefusedError:
+            logger.info("客户端已关闭")
+            break
+        except Exception:
+            logger.exception("Unexpected error")
+            break
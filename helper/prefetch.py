@@ -0,0 +1,87 @@
+import asyncio
+from typing import TYPE_CHECKING, Optional
+
+from loguru import logger
+
+from . import config as CONF
+
+if TYPE_CHECKING:
+    from .lcu import LcuClient
+
+# 在这些阶段中队伍成员已经确定，可以提前获取战绩
+PREFETCH_PHASES = {"Lobby", "Matchmaking", "ReadyCheck"}
+
+
+class Prefetcher:
+    """根据GameFlow阶段在进入英雄选择前预取队伍成员的战绩和召唤师信息"""
+
+    def __init__(self, client: "LcuClient"):
+        self.client = client
+        self.task: Optional[asyncio.Task] = None
+        self.warmed: set[str] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def on_phase(self, phase: str):
+        """GameFlow切换时调用，进入预取阶段时启动预取，离开时取消"""
+
+        if phase not in PREFETCH_PHASES:
+            self.cancel()
+            self.warmed.clear()
+            return
+        # 每次切换阶段都重新获取房间成员，以包含新加入的成员
+        if CONF.PREFETCH and (self.task is None or self.task.done()):
+            self.task = self.client.create_task(self.run())
+
+    def cancel(self):
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+            logger.debug("取消战绩预取")
+        self.task = None
+
+    async def run(self):
+        """获取房间成员和当前召唤师，并发预取未缓存的战绩"""
+
+        try:
+            members = await self.client.get_lobby_members()
+        except Exception:
+            logger.exception("获取房间成员失败")
+            return
+        puuids = [
+            puuid
+            for puuid in dict.fromkeys([self.client.puuid, *members])
+            if puuid and puuid not in self.warmed
+        ]
+        if not puuids:
+            return
+
+        semaphore = asyncio.Semaphore(CONF.PREFETCH_CONCURRENCY)
+
+        async def history(puuid: str):
+            async with semaphore:
+                await self.client.get_match_history_cached(puuid, refresh=True)
+
+        async def warm(puuid: str):
+            # 名称查询合并为批量请求，不占用预取的并发数
+            await asyncio.gather(self.client.get_summoner_name(puuid), history(puuid))
+            self.warmed.add(puuid)
+
+        results = await asyncio.gather(*[warm(puuid) for puuid in puuids], return_exceptions=True)
+        for puuid, result in zip(puuids, results):
+            if isinstance(result, Exception):
+                logger.warning("预取战绩失败: {} {}", puuid, result)
+        logger.info("已预取{}名玩家的战绩", len(self.warmed))
+
+    def record(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def reset_stats(self):
+        self.hits = self.misses = 0
+
+    def report(self):
+        total = self.hits + self.misses
+        if total:
+            logger.info("预取命中率: {:.0%} ({}/{})", self.hits / total, self.hits, total)
@@ -0,0 +1,62 @@
+import gzip
+import json
+from pathlib import Path
+from time import monotonic, strftime
+from typing import Iterator, Union
+
+# 压缩数据写入文件的间隔(秒)，进程被强制结束时最多丢失这段时间的记录
+FLUSH_INTERVAL = 1.0
+
+
+class Recorder:
+    """记录客户端WebSocket消息和HTTP响应，用于离线回放和性能分析
+
+    文件为gzip压缩的JSON lines，每行为以下两种记录之一：
+        [时间偏移(秒), "ws", 消息]
+        [时间偏移(秒), "http", 请求方法, 请求地址, 状态码, 响应内容]
+
+    GUI模式下监听线程随窗口关闭直接结束，来不及调用close，因此每隔FLUSH_INTERVAL秒
+    将压缩数据同步写入文件，未正常关闭的文件也可以读取到最后一次写入的记录。
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.start = self.flushed = monotonic()
+        self._file = gzip.open(path, "wb")
+
+    @classmethod
+    def create(cls, directory: Path, port: str) -> "Recorder":
+        return cls(directory / f"{strftime('%Y%m%d-%H%M%S')}-{port}.jsonl.gz")
+
+    def _write(self, *record):
+        now = monotonic()
+        self._file.write(json.dumps([round(now - self.start, 6), *record]).encode("utf8") + b"\n")
+        if now - self.flushed >= FLUSH_INTERVAL:
+            # Z_SYNC_FLUSH输出所有已压缩的数据，之前的记录不依赖后续数据即可解压
+            self._file.flush()
+            self.flushed = now
+
+    def record_frame(self, frame: Union[str, bytes]):
+        if isinstance(frame, bytes):
+            frame = frame.decode("utf8")
+        self._write("ws", frame)
+
+    def record_response(self, method: str, api: str, status: int, body: str):
+        self._write("http", method, api, status, body)
+
+    def close(self):
+        self._file.close()
+
+
+def load_records(path: Path) -> Iterator[list]:
+    """读取记录，忽略未正常关闭的文件末尾不完整的部分"""
+
+    with gzip.open(path, "rb") as f:
+        try:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                yield json.loads(line)
+        except EOFError:
+            pass
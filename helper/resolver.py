@@ -0,0 +1,91 @@
+import asyncio
+from typing import TYPE_CHECKING, Optional
+
+from httpx import HTTPStatusError
+from loguru import logger
+
+from . import config as CONF
+from .cache import SUMMONER_CACHE
+from .config import Route
+from .scheduler import DEFAULT_POLICY
+
+if TYPE_CHECKING:
+    from .lcu import LcuClient
+
+
+class SummonerResolver:
+    """将短时间内的召唤师名称查询合并为一次批量请求，结果保存在持久化的SUMMONER_CACHE中
+
+    第一个未命中缓存的查询等待CONF.SUMMONER_BATCH_WINDOW秒，期间的其他查询一起通过
+    Route.SummonersByPuuid请求；客户端不支持批量查询时改为逐个请求。
+    """
+
+    def __init__(self, client: "LcuClient"):
+        self.client = client
+        self.pending: dict[str, asyncio.Future] = {}
+        self.flush_task: Optional[asyncio.Task] = None
+        self.batch_supported = True
+        self.lookups = self.hits = self.requests = 0
+
+    async def resolve(self, puuid: str) -> str:
+        """根据puuid获取召唤师名称"""
+
+        self.lookups += 1
+        if (name := SUMMONER_CACHE.get(puuid)) is not None:
+            self.hits += 1
+            return name
+        if (future := self.pending.get(puuid)) is None:
+            future = self.pending[puuid] = asyncio.get_running_loop().create_future()
+            if self.flush_task is None:
+                self.flush_task = self.client.create_task(self.flush())
+        # 同一批次的查询共用future，单个查询被取消时不影响其他查询
+        return await asyncio.shield(future)
+
+    async def flush(self):
+        await asyncio.sleep(CONF.SUMMONER_BATCH_WINDOW)
+        pending, self.pending = self.pending, {}
+        self.flush_task = None
+        try:
+            names = await self.fetch(list(pending))
+        except Exception as e:
+            for future in pending.values():
+                future.set_exception(e)
+            return
+        for puuid, future in pending.items():
+            SUMMONER_CACHE.set(puuid, names[puuid])
+            future.set_result(names[puuid])
+        SUMMONER_CACHE.save()
+
+    async def fetch(self, puuids: list[str]) -> dict[str, str]:
+        names = {}
+        if len(puuids) > 1 and self.batch_supported:
+            self.requests += 1
+            try:
+                summoners = await self.client.post(
+                    Route.SummonersByPuuid, data=puuids, policy=DEFAULT_POLICY  # type: ignore
+                )
+                names = {summoner["puuid"]: summoner["gameName"] for summoner in summoners}
+            except HTTPStatusError as e:
+                if e.response.status_code == 404:
+                    logger.warning("客户端不支持批量查询召唤师，改为逐个查询")
+                    self.batch_supported = False
+                else:
+                    logger.warning("批量查询召唤师失败，改为逐个查询: {}", e)
+
+        # 批量请求未返回的召唤师逐个查询
+        if missing := [puuid for puuid in puuids if puuid not in names]:
+            self.requests += len(missing)
+            summoners = await asyncio.gather(
+                *[self.client.get(Route.Summoner.format(puuid=puuid)) for puuid in missing]
+            )
+            names.update(zip(missing, [summoner["gameName"] for summoner in summoners]))
+        return names
+
+    def reset_stats(self):
+        self.lookups = self.hits = self.requests = 0
+
+    def report(self):
+        if self.lookups:
+            logger.info(
+                "召唤师查询: {}次，缓存命中{}次，请求{}次", self.lookups, self.hits, self.requests
+            )
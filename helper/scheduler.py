@@ -0,0 +1,169 @@
+import asyncio
+import contextlib
+import random
+import re
+from time import monotonic
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+from httpx import ConnectError, Response, TransportError
+from loguru import logger
+
+from . import config as CONF
+
+# 客户端繁忙或暂时不可用时返回的状态码
+RETRY_STATUS = {429, 500, 502, 503, 504}
+_ID_SEGMENT = re.compile(r"/(?:\d+|[0-9a-f-]{20,}|[\w-]{40,})(?=[/.]|$)")
+_NO_LIMIT = contextlib.nullcontext()
+
+
+class RetryPolicy(NamedTuple):
+    """重试策略，第n次重试前等待 [0, min(max_delay, base_delay * 2^n)] 之间的随机时间
+
+    urgent为True时请求不受令牌桶和并发上限限制，用于接受对局等有时限的操作
+    """
+
+    attempts: int = 3
+    base_delay: float = 0.1
+    max_delay: float = 1.0
+    urgent: bool = False
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+NO_RETRY = RetryPolicy(attempts=1)
+DEFAULT_POLICY = RetryPolicy()
+
+
+def route_key(api: str) -> str:
+    """去掉查询参数和路径中的id，用于按接口统计请求"""
+
+    return _ID_SEGMENT.sub("/{}", api.split("?", 1)[0])
+
+
+def is_retryable(resp: Response) -> bool:
+    return resp.status_code in RETRY_STATUS
+
+
+class RouteStats:
+    __slots__ = ("requests", "retries", "failures", "latency")
+
+    def __init__(self):
+        self.requests = self.retries = self.failures = 0
+        self.latency = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "avg_latency": round(self.latency / (self.requests or 1), 4),
+        }
+
+
+class RequestScheduler:
+    """单个客户端的请求调度器，所有请求共享并发上限和令牌桶
+
+    请求速率根据延迟和错误率自适应调整：延迟低于目标时线性增加，出现可重试错误或延迟过高时
+    按比例降低，避免爬取数据时压垮客户端。
+    """
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        min_rate: Optional[float] = None,
+        max_rate: Optional[float] = None,
+    ):
+        # 未指定的参数在创建时读取配置，使配置文件的修改对之后连接的客户端生效
+        self.rate = CONF.REQUEST_RATE if rate is None else rate
+        self.min_rate = CONF.REQUEST_RATE_MIN if min_rate is None else min_rate
+        self.max_rate = CONF.REQUEST_RATE_MAX if max_rate is None else max_rate
+        self.burst = CONF.REQUEST_BURST if burst is None else burst
+        self.tokens = float(self.burst)
+        self.updated = monotonic()
+        self.routes: dict[str, RouteStats] = {}
+        self._semaphore = asyncio.Semaphore(
+            CONF.REQUEST_CONCURRENCY if concurrency is None else concurrency
+        )
+        self._bucket_lock = asyncio.Lock()
+
+    async def _acquire_token(self):
+        async with self._bucket_lock:
+            while True:
+                now = monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def _adapt(self, latency: float, ok: bool):
+        if ok and latency < CONF.REQUEST_TARGET_LATENCY:
+            self.rate = min(self.max_rate, self.rate + 0.5)
+        else:
+            self.rate = max(self.min_rate, self.rate * 0.7)
+
+    async def request(
+        self,
+        api: str,
+        send: Callable[[], Awaitable[Response]],
+        policy: RetryPolicy = DEFAULT_POLICY,
+        retry_on: Optional[Callable[[Response], bool]] = None,
+    ) -> Response:
+        """发送请求，遇到可重试的错误或retry_on返回True时按策略重试
+
+        Args:
+            api: 请求地址，用于统计
+            send: 发送请求的函数
+            policy: 重试策略
+            retry_on: 额外的重试条件，如返回空数据
+        Returns:
+            resp: 最后一次请求的响应，重试次数用尽时不保证成功
+        """
+        stats = self.routes.setdefault(route_key(api), RouteStats())
+        attempt = 0
+        while True:
+            last = attempt + 1 >= policy.attempts
+            if not policy.urgent:
+                await self._acquire_token()
+            async with self._semaphore if not policy.urgent else _NO_LIMIT:
+                start = monotonic()
+                try:
+                    resp = await send()
+                except ConnectError:
+                    stats.failures += 1
+                    raise
+                except TransportError:
+                    stats.failures += 1
+                    self._adapt(monotonic() - start, False)
+                    if last:
+                        raise
+                    retry = True
+                else:
+                    latency = monotonic() - start
+                    stats.requests += 1
+                    stats.latency += latency
+                    retryable = is_retryable(resp)
+                    self._adapt(latency, not retryable)
+                    retry = retryable or (retry_on is not None and retry_on(resp))
+            if not retry or last:
+                if retry:
+                    stats.failures += 1
+                return resp
+            stats.retries += 1
+            await asyncio.sleep(policy.delay(attempt))
+            attempt += 1
+
+    def stats(self) -> dict[str, dict]:
+        """各接口的请求、重试、失败次数和平均延迟"""
+
+        return {route: stats.to_dict() for route, stats in self.routes.items()}
+
+    def log_stats(self):
+        """输出各接口的请求统计，在对局开始和客户端监听结束时调用"""
+
+        for route, stats in self.stats().items():
+            logger.info("请求统计 {}: {}", route, stats)
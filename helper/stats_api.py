@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import json
+from typing import TYPE_CHECKING, Optional, Union
+
+from loguru import logger
+
+from . import config as CONF
+from .match_index import MATCH_INDEX
+
+if TYPE_CHECKING:
+    from .lcu import LcuClient
+
+_REASONS = {200: "OK", 304: "Not Modified", 404: "Not Found", 405: "Method Not Allowed"}
+_EVENT_QUEUE_SIZE = 64
+
+
+class StatsServer:
+    """本地只读HTTP接口，提供各客户端已分析的战绩、英雄选择状态和保存的比赛记录
+
+    所有数据来自内存中已获取的结果，不会请求客户端。响应内容按数据版本缓存并带有ETag，
+    请求头If-None-Match与ETag相同时返回304；/events 以Server-Sent Events推送状态更新。
+
+    接口：
+        GET /clients                        所有客户端的召唤师、端口和游戏阶段
+        GET /clients/{port}/teammates       队友战绩分析
+        GET /clients/{port}/enemies         敌方战绩分析
+        GET /clients/{port}/champ-select    英雄选择会话
+        GET /matches/{puuid}                保存的比赛记录中该玩家的近期比赛
+        GET /events                         状态更新事件流
+    """
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None):
+        self.host = CONF.STATS_API_HOST if host is None else host
+        self.port = CONF.STATS_API_PORT if port is None else port
+        self.clients: dict[str, "LcuClient"] = {}
+        self.server: Optional[asyncio.Server] = None
+        self.subscribers: set[asyncio.Queue] = set()
+        self.version = 0
+        self.requests = 0
+        # 路径 -> (数据版本, ETag, 响应内容)，只缓存存在的路径，数量不超过客户端和索引中的玩家数
+        # 只在事件循环中读写
+        self._responses: dict[str, tuple[int, str, bytes]] = {}
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logger.info("战绩接口已启动: http://{}:{}", self.host, self.port)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, message: Optional[bytes]):
+        if queue.full():
+            # 消费过慢时丢弃最旧的事件
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    async def close(self):
+        for queue in self.subscribers:
+            self._put(queue, None)
+        if self.server is not None:
+            self.server.close()
+            # 空闲的keep-alive连接会一直等待下一个请求，需要主动断开，否则wait_closed不会返回
+            self.server.close_clients()
+            await self.server.wait_closed()
+
+    def add_client(self, client: "LcuClient"):
+        self.clients[client.port] = client
+        client.on_update = self.publish
+        self.publish(client, "connected")
+
+    def remove_client(self, client: "LcuClient"):
+        if self.clients.pop(client.port, None) is not None:
+            client.on_update = None
+            prefix = f"/clients/{client.port}/"
+            for path in [path for path in self._responses if path.startswith(prefix)]:
+                del self._responses[path]
+            self.publish(client, "disconnected")
+
+    def publish(self, client: "LcuClient", event: str):
+        """数据更新后使缓存的响应失效，并通知所有订阅者"""
+
+        self.version += 1
+        if not self.subscribers:
+            return
+        message = (
+            f"event: {event}\n"
+            f"data: {json.dumps({'port': client.port, 'version': self.version})}\n\n"
+        ).encode()
+        for queue in self.subscribers:
+            self._put(queue, message)
+
+    def resolve(self, path: str) -> Optional[Union[dict, list]]:
+        """根据请求路径返回数据，路径不存在时返回None"""
+
+        parts = path.strip("/").split("/")
+        if parts == ["clients"]:
+            return [
+                {
+                    "port": client.port,
+                    "name": getattr(client, "name", ""),
+                    "phase": client.phase,
+                }
+                for client in self.clients.values()
+            ]
+        if len(parts) == 3 and parts[0] == "clients" and (client := self.clients.get(parts[1])):
+            if parts[2] == "teammates":
+                return client.teammate_analysis
+            if parts[2] == "enemies":
+                return client.enemy_analysis
+            if parts[2] == "champ-select":
+                return client.champ_select
+        if len(parts) == 2 and parts[0] == "matches" and parts[1] in MATCH_INDEX.offsets:
+            return MATCH_INDEX.lookup(parts[1])
+        return None
+
+    def build(self, path: str) -> Optional[tuple[str, bytes]]:
+        """生成ETag和响应内容，不读写缓存"""
+
+        if (data := self.resolve(path)) is None:
+            return None
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+        return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"', body
+
+    async def render(self, path: str) -> Optional[tuple[str, bytes]]:
+        """返回ETag和响应内容，数据未更新时使用缓存"""
+
+        path = "/" + path.strip("/")
+        # 比赛记录只在对局开始时追加，以记录文件长度作为数据版本，不随客户端状态更新失效
+        matches = path.startswith("/matches/")
+        version = MATCH_INDEX.end if matches else self.version
+        if (cached := self._responses.get(path)) is not None and cached[0] == version:
+            return cached[1], cached[2]
+        # 比赛记录需要读取文件，在线程中生成，避免阻塞事件循环
+        rendered = await asyncio.to_thread(self.build, path) if matches else self.build(path)
+        if rendered is not None:
+            self._responses[path] = (version, *rendered)
+        return rendered
+
+    @staticmethod
+    def _head(status: int, headers: dict[str, str]) -> bytes:
+        lines = [f"HTTP/1.1 {status} {_REASONS[status]}"]
+        lines.extend(f"{key}: {value}" for key, value in headers.items())
+        return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个连接上的请求，支持keep-alive"""
+
+        try:
+            while True:
+                try:
+                    request = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    return
+                request_line, *header_lines = request.decode("latin-1").split("\r\n")
+                method, target, _ = request_line.split(" ", 2)
+                headers = {
+                    key.strip().lower(): value.strip()
+                    for key, _, value in (line.partition(":") for line in header_lines if line)
+                }
+                path = target.split("?", 1)[0]
+                self.requests += 1
+                if method == "GET" and path == "/events":
+                    await self.stream_events(writer)
+                    return
+                writer.write(await self.respond(method, path, headers))
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    return
+        except (ConnectionError, ValueError):
+            return
+        finally:
+            writer.close()
+
+    async def respond(self, method: str, path: str, headers: dict[str, str]) -> bytes:
+        base = {"Access-Control-Allow-Origin": "*"}
+        if method not in ("GET", "HEAD"):
+            return self._head(405, {**base, "Allow": "GET, HEAD", "Content-Length": "0"})
+        if (rendered := await self.render(path)) is None:
+            return self._head(404, {**base, "Content-Length": "0"})
+        etag, body = rendered
+        if headers.get("if-none-match") == etag:
+            return self._head(304, {**base, "ETag": etag})
+        head = self._head(
+            200,
+            {
+                **base,
+                "Content-Type": "application/json; charset=utf-8",
+                "Content-Length": str(len(body)),
+                "ETag": etag,
+                "Cache-Control": "no-cache",
+            },
+        )
+        return head if method == "HEAD" else head + body
+
+    async def stream_events(self, writer: asyncio.StreamWriter):
+        queue: asyncio.Queue = asyncio.Queue(_EVENT_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        try:
+            writer.write(
+                self._head(
+                    200,
+                    {
+                        "Access-Control-Allow-Origin": "*",
+                        "Content-Type": "text/event-stream",
+                        "Cache-Control": "no-cache",
+                    },
+                )
+            )
+            writer.write(f"retry: 3000\ndata: {json.dumps({'version': self.version})}\n\n".encode())
+            await writer.drain()
+            while (message := await queue.get()) is not None:
+                writer.write(message)
+                await writer.drain()
+        finally:
+            self.subscribers.discard(queue)
@@ -0,0 +1,77 @@
+import asyncio
+from typing import Callable, Optional
+
+from loguru import logger
+
+from . import config as CONF
+from .exceptions import ClientNotStart
+from .lcu import LcuClient, get_all_lcu_info
+from .monitor import run_client
+from .stats_api import StatsServer
+
+
+class Supervisor:
+    """在同一个事件循环中监听本机所有客户端，每个客户端对应一个监听任务
+
+    英雄名称、战绩和召唤师缓存为模块级共享缓存，客户端越多命中率越高，单个客户端只额外占用
+    一个连接池和一个WebSocket连接。
+
+    Args:
+        discover: 返回所有客户端(token, port)的函数
+        client_factory: 根据token和port创建客户端
+        exit_when_empty: 所有客户端关闭后是否退出，否则持续等待新客户端
+    """
+
+    def __init__(
+        self,
+        discover: Callable[[], list[tuple[str, str]]] = get_all_lcu_info,
+        client_factory: Callable[[str, str], LcuClient] = LcuClient,
+        exit_when_empty: bool = True,
+    ):
+        self.discover = discover
+        self.client_factory = client_factory
+        self.exit_when_empty = exit_when_empty
+        self.clients: dict[tuple[str, str], asyncio.Task] = {}
+        self.stats: Optional[StatsServer] = None
+
+    async def scan(self):
+        """查找新启动的客户端并启动监听，遍历进程较慢，在线程中执行避免阻塞其他客户端"""
+
+        for token, port in await asyncio.to_thread(self.discover):
+            if (token, port) in self.clients:
+                continue
+            logger.info("发现客户端: port={}", port)
+            task = asyncio.create_task(self.run_client(token, port))
+            self.clients[(token, port)] = task
+            task.add_done_callback(lambda _, key=(token, port): self.clients.pop(key, None))
+
+    async def run_client(self, token: str, port: str):
+        client = self.client_factory(token, port)
+        try:
+            await client.get_summoner_info()
+            if self.stats is not None:
+                self.stats.add_client(client)
+            await run_client(client)
+        except Exception:
+            logger.exception("客户端监听异常: port={}", port)
+        finally:
+            if self.stats is not None:
+                self.stats.remove_client(client)
+            await client.client.aclose()
+            logger.info("客户端监听已停止: port={}", port)
+
+    async def run(self):
+        if CONF.STATS_API:
+            self.stats = StatsServer()
+        await self.scan()
+        if not self.clients and self.exit_when_empty:
+            raise ClientNotStart
+        if self.stats is not None:
+            await self.stats.start()
+        try:
+            while self.clients or not self.exit_when_empty:
+                await asyncio.sleep(CONF.DISCOVER_INTERVAL)
+                await self.scan()
+        finally:
+            if self.stats is not None:
+                await self.stats.close()
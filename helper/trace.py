@@ -0,0 +1,140 @@
+import asyncio
+import contextlib
+import functools
+import itertools
+import json
+from contextvars import ContextVar
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Iterator, Optional
+
+from . import config as CONF
+
+# 当前协程所在的区间id，子任务创建时复制上下文，因此可以找到跨任务的父区间
+_current_span: ContextVar[int] = ContextVar("current_span", default=0)
+_span_ids = itertools.count(1)
+
+
+def _thread_name(pid: int, tid: int, name: str) -> dict:
+    return {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+
+
+class Tracer:
+    """记录单个客户端的耗时区间，导出为Chrome trace event格式
+
+    每个asyncio任务对应时间线上的一行，同一任务内的区间按时间嵌套；跨任务的父子关系记录在
+    区间参数的parent中。GameFlow阶段单独显示在第0行，导出的文件可以在 chrome://tracing 或
+    https://ui.perfetto.dev 中查看。
+    """
+
+    def __init__(self, pid: int = 0):
+        self.pid = pid
+        self.start = perf_counter()
+        self.events: list[dict] = []
+        self.phase_name = ""
+        self.phase_start = 0.0
+        self._tids: dict[str, int] = {}
+
+    def _now(self) -> float:
+        return (perf_counter() - self.start) * 1e6
+
+    def _tid(self) -> int:
+        task = asyncio.current_task()
+        name = task.get_name() if task is not None else "main"
+        if (tid := self._tids.get(name)) is None:
+            tid = self._tids[name] = len(self._tids) + 1
+            self.events.append(_thread_name(self.pid, tid, name))
+        return tid
+
+    @contextlib.contextmanager
+    def span(self, name: str, **args) -> Iterator[None]:
+        """记录with语句块的耗时，args会显示在区间详情中"""
+
+        span_id = next(_span_ids)
+        args.update(id=span_id, parent=_current_span.get(), phase=self.phase_name)
+        token = _current_span.set(span_id)
+        tid = self._tid()
+        start = self._now()
+        try:
+            yield
+        except BaseException as e:
+            args["error"] = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            self.events.append(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "pid": self.pid,
+                    "tid": tid,
+                    "ts": start,
+                    "dur": self._now() - start,
+                    "args": args,
+                }
+            )
+
+    def phase(self, name: str):
+        """切换GameFlow阶段，结束上一个阶段的区间"""
+
+        now = self._now()
+        if self.phase_name:
+            self.events.append(
+                {
+                    "name": self.phase_name,
+                    "cat": "gameflow",
+                    "ph": "X",
+                    "pid": self.pid,
+                    "tid": 0,
+                    "ts": self.phase_start,
+                    "dur": now - self.phase_start,
+                }
+            )
+        self.phase_name = name
+        self.phase_start = now
+
+    def dump(self, path: Path) -> int:
+        """保存已记录的区间并清空，返回保存的区间数量"""
+
+        count = len(self.events)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf8") as f:
+            json.dump(
+                {
+                    "traceEvents": [_thread_name(self.pid, 0, "GameFlow"), *self.events],
+                    "displayTimeUnit": "ms",
+                },
+                f,
+                ensure_ascii=False,
+            )
+        self.events.clear()
+        self._tids.clear()
+        return count
+
+
+def traced(
+    func: Optional[Callable] = None, *, label: Optional[Callable[..., str]] = None
+) -> Any:
+    """记录异步方法的耗时区间，方法所属对象需要有tracer属性
+
+    未开启CONF.TRACE时直接返回原协程，只多一次函数调用。
+
+    Args:
+        label: 根据方法参数生成区间名称，默认为方法名
+    """
+
+    def decorator(func: Callable) -> Callable:
+        async def run(self, name: str, coro):
+            with self.tracer.span(name):
+                return await coro
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not CONF.TRACE:
+                return func(self, *args, **kwargs)
+            name = label(self, *args, **kwargs) if label else func.__name__
+            return run(self, name, func(self, *args, **kwargs))
+
+        return wrapper
+
+    return decorator(func) if func is not None else decorator
@@ -0,0 +1,300 @@
+"""离线分析保存的比赛记录
+
+支持两种数据：
+- CONF.MATCH_FILE：每行一局游戏，内容为己方队伍成员的近20场记录
+- data/*.json：get_history_data.py 爬取的数据，成员通过gameId引用去重后的比赛
+
+数据按分片交给进程池解析，工作进程按puuid将玩家分组，同一组的比赛在另一个工作进程中去重合并并统计，
+主进程只转发序列化的分组。结果为每位玩家和每支队伍的kda、分均伤害、胜率和连胜/连败场次，
+队伍只统计该条记录中成员的比赛，在解析时计算。
+
+用法：
+    python scripts/analyze_matches.py [files ...] -o result.json.gz -j 8
+    python scripts/analyze_matches.py [files ...] -j 8 --scaling   # 比较1~8个进程的处理速度
+"""
+
+import argparse
+import gzip
+import json
+import os
+import pickle
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from time import perf_counter
+from typing import Iterator, Optional
+
+ROOT = Path(__file__).parent.parent
+DATA_DIR = ROOT / "data"
+sys.path.append(str(ROOT))
+
+from helper import config as CONF
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# 单场记录：kills, deaths, assists, 对英雄伤害, 游戏时长(秒), 是否胜利
+Game = tuple[int, int, int, int, int, bool]
+# 队伍：队伍标识, 胜负, 成员的平均kda, 分均伤害, 胜率, 连胜/连败场次
+Team = tuple[str, Optional[bool], float, float, float, float]
+# 分片结果：{puuid: {creation: Game}}，[Team]
+Partial = tuple[dict[str, dict[int, Game]], list[Team]]
+# 玩家统计：场次, kda, 分均伤害, 胜率, 连胜/连败场次
+Summary = tuple[int, float, float, float, int]
+
+
+def is_mode(match: dict, game_mode: str) -> bool:
+    """兼容两种数据格式的游戏模式判断"""
+
+    if "mode" in match:
+        return match["mode"] == game_mode
+    return match.get("ARAM", False) == (game_mode == "ARAM")
+
+
+def add_team(
+    partial: Partial, key: str, win: Optional[bool], members: list[dict], game_mode: str
+):
+    players, teams = partial
+    stats = []
+    for member in members:
+        games: dict[int, Game] = {}
+        for match in member["matches"]:
+            if not is_mode(match, game_mode):
+                continue
+            games[match["creation"]] = (
+                match["kills"],
+                match["deaths"],
+                match["assists"],
+                match["totalDamageDealtToChampions"],
+                match["duration"],
+                match["win"],
+            )
+        players.setdefault(member["puuid"], {}).update(games)
+        if games:
+            stats.append(summarize(games))
+    # 队伍统计只使用本条记录中成员的比赛，不包含成员在其他记录中更早或更晚的比赛
+    count = len(stats) or 1
+    teams.append(
+        (key, win, *(round(sum(stat[i] for stat in stats) / count, 3) for i in range(1, 5)))
+    )
+
+
+def iter_lines(filename: str, start: int, end: int) -> Iterator[tuple[int, bytes]]:
+    """读取文件中起始位置落在[start, end)的所有行"""
+
+    with open(filename, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            # 上一个分片负责读取跨越边界的行
+            if f.read(1) != b"\n":
+                f.readline()
+        while (offset := f.tell()) < end:
+            if not (line := f.readline()):
+                break
+            yield offset, line
+
+
+def analyze_lines(filename: str, start: int, end: int, game_mode: str) -> Partial:
+    """解析 MATCH_FILE 格式的分片"""
+
+    partial: Partial = ({}, [])
+    for offset, line in iter_lines(filename, start, end):
+        if line := line.strip():
+            add_team(partial, f"{Path(filename).name}:{offset}", None, json.loads(line), game_mode)
+    return partial
+
+
+def expand_members(members: list[dict], games: dict[str, dict]) -> list[dict]:
+    """将成员引用的gameId展开为比赛数据"""
+
+    expanded = []
+    for member in members:
+        matches = []
+        for game_id in member["game_ids"]:
+            game = games[str(game_id)]
+            matches.append(
+                {
+                    **game["players"][member["puuid"]],
+                    "creation": game["creation"],
+                    "duration": game["duration"],
+                    "ARAM": game["ARAM"],
+                }
+            )
+        expanded.append({"puuid": member["puuid"], "matches": matches})
+    return expanded
+
+
+def analyze_json(filename: str, game_mode: str) -> Partial:
+    """解析 get_history_data.py 保存的数据文件，兼容未去重的旧格式"""
+
+    partial: Partial = ({}, [])
+    with open(filename, encoding="utf8") as f:
+        data = json.load(f)
+    # 新格式在获取比赛详情前也会保存，此时games为空，成员的game_ids也为空
+    deduplicated = isinstance(data, dict)
+    for match in data["matches"] if deduplicated else data:
+        members = match["members_data"]
+        if deduplicated:
+            members = expand_members(members, data["games"])
+        add_team(partial, str(match["match_id"]), match["win"], members, game_mode)
+    return partial
+
+
+def merge(total: Partial, partial: Partial):
+    players, teams = total
+    for puuid, games in partial[0].items():
+        if puuid in players:
+            # 同一玩家在不同队伍中的近期战绩会重叠，按创建时间去重
+            players[puuid].update(games)
+        else:
+            players[puuid] = games
+    teams.extend(partial[1])
+
+
+def summarize(games: dict[int, Game]) -> Summary:
+    """计算场次、kda、分均伤害、胜率和连胜/连败场次"""
+
+    if not games:
+        return 0, 0, 0, 0, 0
+    kills = deaths = assists = damages = duration = wins = repeats = 0
+    ordered = [games[creation] for creation in sorted(games, reverse=True)]
+    for kill, death, assist, damage, seconds, win in ordered:
+        kills += kill
+        deaths += death
+        assists += assist
+        damages += damage
+        duration += seconds
+        wins += win
+    latest = ordered[0][5]
+    for game in ordered:
+        if game[5] != latest:
+            break
+        repeats += 1 if latest else -1
+    return (
+        len(ordered),
+        round((kills + assists) / (deaths or 1), 3),
+        round(damages / (duration or 1) * 60, 3),
+        round(wins / len(ordered), 3),
+        repeats,
+    )
+
+
+def plan(files: list[Path], chunk_size: int) -> list[tuple]:
+    """将输入文件拆分为进程池任务"""
+
+    tasks = []
+    for filename in files:
+        if filename.suffix == ".json":
+            tasks.append((analyze_json, str(filename)))
+            continue
+        size = filename.stat().st_size
+        for start in range(0, size, chunk_size):
+            tasks.append((analyze_lines, str(filename), start, min(start + chunk_size, size)))
+    return tasks
+
+
+def run_task(task: tuple, game_mode: str) -> Partial:
+    func, *args = task
+    return func(*args, game_mode)
+
+
+def map_task(task: tuple, game_mode: str, shards: int) -> tuple[list[bytes], list[Team]]:
+    """解析分片并按puuid将玩家分为shards组，每组单独序列化，主进程只转发不反序列化"""
+
+    players, teams = run_task(task, game_mode)
+    groups: list[dict[str, dict[int, Game]]] = [{} for _ in range(shards)]
+    for puuid, games in players.items():
+        groups[zlib.crc32(puuid.encode()) % shards][puuid] = games
+    return [pickle.dumps(group, pickle.HIGHEST_PROTOCOL) for group in groups], teams
+
+
+def reduce_shard(groups: list[bytes]) -> dict[str, Summary]:
+    """合并同一组玩家在各分片中的比赛并统计，同一组的玩家只出现在这一个任务中"""
+
+    total: Partial = ({}, [])
+    for group in groups:
+        merge(total, (pickle.loads(group), []))
+    return {puuid: summarize(games) for puuid, games in total[0].items()}
+
+
+def analyze(
+    files: list[Path], game_mode: str, workers: int, chunk_size: int = CHUNK_SIZE
+) -> dict:
+    tasks = plan(files, chunk_size)
+    if workers <= 1:
+        total: Partial = ({}, [])
+        for task in tasks:
+            merge(total, run_task(task, game_mode))
+        players = {puuid: summarize(games) for puuid, games in total[0].items()}
+        teams = total[1]
+    else:
+        # 同一玩家的近期比赛会出现在多个分片中，需要全部收集后才能去重，因此按puuid分组后再统计
+        shards: list[list[bytes]] = [[] for _ in range(workers)]
+        teams = []
+        with ProcessPoolExecutor(workers) as executor:
+            for groups, partial_teams in executor.map(
+                map_task, tasks, repeat(game_mode), repeat(workers)
+            ):
+                for shard, group in zip(shards, groups):
+                    shard.append(group)
+                teams.extend(partial_teams)
+            players = {}
+            for result in executor.map(reduce_shard, shards):
+                players.update(result)
+    return {
+        "mode": game_mode,
+        "player_columns": ["games", "kda", "damage_per_minute", "win_rate", "repeats"],
+        "players": players,
+        "team_columns": ["key", "win", "kda", "damage_per_minute", "win_rate", "repeats"],
+        "teams": teams,
+    }
+
+
+def default_files() -> list[Path]:
+    files = sorted(DATA_DIR.glob("*.json")) if DATA_DIR.is_dir() else []
+    if CONF.MATCH_FILE.is_file():
+        files.append(CONF.MATCH_FILE)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程离线分析保存的比赛记录")
+    parser.add_argument("files", nargs="*", type=Path, help="默认分析MATCH_FILE和data/*.json")
+    parser.add_argument("-o", "--output", type=Path, default=ROOT / "analysis.json.gz")
+    parser.add_argument("-m", "--mode", default=CONF.GameMode.ARAM)
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="分片大小(字节)")
+    parser.add_argument(
+        "--scaling", action="store_true", help="依次使用1~j个进程分析并输出速度，不保存结果"
+    )
+    args = parser.parse_args()
+
+    if not (files := args.files or default_files()):
+        print("No match file found")
+        exit()
+
+    if args.scaling:
+        for workers in range(1, args.workers + 1):
+            start = perf_counter()
+            result = analyze(files, args.mode, workers, args.chunk_size)
+            elapsed = perf_counter() - start
+            speed = len(result["teams"]) / elapsed
+            print(f"-j {workers:<3} {elapsed:7.2f}s  {speed:8.0f} records/s")
+        return
+
+    start = perf_counter()
+    result = analyze(files, args.mode, args.workers, args.chunk_size)
+    elapsed = perf_counter() - start
+
+    with gzip.open(args.output, "wt", encoding="utf8") as f:
+        json.dump(result, f, ensure_ascii=False, separators=(",", ":"))
+    print(
+        f"Analyzed {len(result['teams'])} records, {len(result['players'])} players "
+        f"in {elapsed:.2f}s ({len(result['teams']) / elapsed:.0f} records/s), "
+        f"saved to {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
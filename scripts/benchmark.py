@@ -0,0 +1,528 @@
+"""基于模拟数据的性能基准测试
+
+用法：
+    python scripts/benchmark.py                 # 运行所有用例并与基准结果比较
+    python scripts/benchmark.py --save          # 运行并保存为新的基准结果
+    python scripts/benchmark.py analysis -s 2   # 只运行名称包含analysis的用例，数据规模x2
+    python scripts/benchmark.py --lookup 10000  # 比较比赛记录索引与全量扫描的查找耗时
+    python scripts/benchmark.py --stats-api 50  # 本地战绩接口的每秒请求数
+    python scripts/benchmark.py --summoners 20  # 每局英雄选择查询召唤师的请求次数
+
+结果与基准相比变慢超过阈值(默认20%)时返回非零退出码。
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from statistics import median
+from time import perf_counter
+from typing import Callable, Optional
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+
+from loguru import logger
+
+from fake_data import FakeData, FakeLcuClient, FakeLcuServer
+from helper import config as CONF
+from helper.algorithm import analysis_match_list
+from helper.cache import HISTORY_CACHE, SUMMONER_CACHE
+from helper.config import Route
+from helper.match_index import MATCH_INDEX
+from helper.stats_api import StatsServer
+from helper.supervisor import Supervisor
+
+BASELINE_FILE = ROOT / "benchmark.json"
+
+# 用例名称 -> 接收数据规模并返回单次执行函数的构造器，环境不满足时构造器返回None
+CASES: dict[str, Callable[[int], Optional[Callable[[], None]]]] = {}
+
+
+def case(name: str):
+    def decorator(func: Callable[[int], Optional[Callable[[], None]]]):
+        CASES[name] = func
+        return func
+
+    return decorator
+
+
+def run_async(coro_func: Callable) -> Callable[[], None]:
+    """在同一个事件循环中重复运行协程函数"""
+
+    loop = asyncio.new_event_loop()
+    return lambda: loop.run_until_complete(coro_func())
+
+
+@case("analysis_match_list")
+def bench_analysis(size: int):
+    data = FakeData(seed=1, players=100 * size)
+    histories = [data.match_history(puuid)["games"]["games"] for puuid in data.puuids]
+
+    def run():
+        for matches in histories:
+            analysis_match_list(matches, CONF.GameMode.ARAM)
+
+    return run
+
+
+@case("calculate_summoner_score")
+def bench_summoner_score(size: int):
+    client = FakeLcuClient(FakeData(seed=2, players=50 * size))
+
+    async def run():
+        HISTORY_CACHE.clear()
+        SUMMONER_CACHE.clear()
+        for puuid in client.data.puuids:
+            await client.calculate_summoner_score(puuid)
+        client.members_matches.clear()
+
+    return run_async(run)
+
+
+@case("handle_ws_response")
+def bench_ws_decode(size: int):
+    client = FakeLcuClient(FakeData(seed=3))
+    # 已选择英雄时只解析消息，不触发自动选择
+    client.picked = True
+    frames = [
+        FakeData.ws_frame(Route.BpSession, client.data.champ_select_session(index=i))
+        for i in range(200 * size)
+    ]
+
+    async def run():
+        for frame in frames:
+            await client.handle_ws_response(frame)
+
+    return run_async(run)
+
+
+@case("auto_pick")
+def bench_auto_pick(size: int):
+    client = FakeLcuClient(FakeData(seed=4))
+    sessions = [client.data.champ_select_session(bench=i % 2 == 0, index=i) for i in range(50)]
+    # 优先选择的英雄均不可用，需要遍历全部列表
+    picks = [str(champion) for champion in range(1000, 1000 + 20 * size)]
+
+    async def run():
+        CONF.AUTO_PICKS = picks
+        for session in sessions:
+            client.picked = False
+            await client.auto_pick(session)
+
+    return run_async(run)
+
+
+@case("match_file_write_read")
+def bench_match_file(size: int):
+    client = FakeLcuClient(FakeData(seed=5, players=50))
+    loop = asyncio.new_event_loop()
+    records = [
+        [loop.run_until_complete(client.calculate_summoner_score(puuid))[0] for puuid in team]
+        for team in zip(*[iter(client.data.puuids)] * 5)
+    ]
+    loop.close()
+    records = records * 10 * size
+    directory = tempfile.TemporaryDirectory()
+    filename = Path(directory.name) / "matches.txt"
+
+    def run():
+        with filename.open("w") as f:
+            for record in records:
+                f.write(json.dumps(record))
+                f.write("\n")
+        with filename.open() as f:
+            for line in f:
+                json.loads(line)
+
+    run.directory = directory  # type: ignore # 保持临时目录直到用例结束
+    return run
+
+
+@case("multi_client")
+def bench_multi_client(size: int):
+    """Supervisor通过本地wss服务监听多个客户端，在同一个事件循环中同时处理英雄选择会话"""
+
+    if (context := FakeLcuServer.self_signed_context()) is None:
+        return None
+    data = FakeData(seed=6)
+    frames = [FakeData.ws_frame(Route.GameFlow, "ReadyCheck")] + [
+        FakeData.ws_frame(Route.BpSession, data.champ_select_session(index=i)) for i in range(20)
+    ]
+
+    async def run():
+        CONF.AUTO_PICKS = [str(champion) for champion in data.champions[:3]]
+        CONF.DISCOVER_INTERVAL = 0.01
+        servers = [FakeLcuServer(frames, context) for _ in range(10 * size)]
+        await asyncio.gather(*[server.start() for server in servers])
+        supervisor = Supervisor(
+            discover=lambda: [("fake", server.port) for server in servers if server.running],
+            client_factory=lambda _, port: FakeLcuClient(data, latency=0.001, port=port),
+        )
+        await supervisor.run()
+        await asyncio.gather(*[server.wait_closed() for server in servers])
+
+    return run_async(run)
+
+
+def client_overhead(counts: list[int]):
+    """测量不同客户端数量下每个客户端占用的内存"""
+
+    data = FakeData(seed=6)
+    for count in counts:
+        tracemalloc.start()
+        clients = [FakeLcuClient(data, port=str(i)) for i in range(count)]
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f"clients={count:<5} total={current / 1024:10.1f} KiB  "
+            f"per client={current / 1024 / count:8.1f} KiB"
+        )
+        del clients
+
+
+def accept_latency(samples: int):
+    """准备确认事件到接受成功的延迟分布，模拟预取占满请求配额且接受请求30%失败"""
+
+    async def run():
+        data = FakeData(seed=7)
+        client = FakeLcuClient(data, latency=0.002, throttle=True, failures={Route.AcceptGame: 0.3})
+        for _ in range(samples):
+            # 同时进行的战绩请求占用令牌桶和并发上限
+            background = [
+                client.create_task(client.get_match_history(puuid)) for puuid in data.puuids[:20]
+            ]
+            # 每次准备确认只接受一次，重新匹配后才会再次接受
+            await client.handle_ws_response(FakeData.ws_frame(Route.GameFlow, "Matchmaking"))
+            await client.handle_ws_response(data.ready_check())
+            await client.accept_task  # type: ignore
+            await asyncio.gather(*background)
+        return client.accept_latencies
+
+    latencies = sorted(asyncio.run(run()))
+    for name, quantile in [("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1)]:
+        value = latencies[min(len(latencies) - 1, int(len(latencies) * quantile))]
+        print(f"accept latency {name}: {value * 1000:8.3f} ms")
+
+
+def match_lookup(records: int):
+    """在records局游戏的记录文件中查找玩家，比较索引查找和全量扫描的耗时
+
+    队伍中有1名出现在每局中的好友，其余4名从玩家池中随机选择。
+    """
+
+    data = FakeData(seed=8, players=max(50, records // 4))
+    client = FakeLcuClient(FakeData(seed=8, players=5))
+    loop = asyncio.new_event_loop()
+    template = loop.run_until_complete(client.calculate_summoner_score(client.puuid))[0]
+    loop.close()
+    rng = random.Random(8)
+    directory = tempfile.TemporaryDirectory()
+    CONF.MATCH_FILE = Path(directory.name) / "matches.txt"
+    with CONF.MATCH_FILE.open("w") as f:
+        for _ in range(records):
+            puuids = [data.puuids[0], *rng.sample(data.puuids[1:], 4)]
+            team = [{**template, "puuid": puuid} for puuid in puuids]
+            f.write(json.dumps(team))
+            f.write("\n")
+    targets = [data.puuids[0], *rng.sample(data.puuids[1:], 19)]
+
+    def scan():
+        # 全量扫描耗时与查找的玩家无关，只测量一次
+        with CONF.MATCH_FILE.open() as f:
+            for line in f:
+                [member for member in json.loads(line) if member["puuid"] == targets[0]]
+
+    def summary():
+        for puuid in targets:
+            MATCH_INDEX.summary(puuid, CONF.GameMode.ARAM)
+
+    def lookup():
+        for puuid in targets:
+            MATCH_INDEX.lookup(puuid)
+
+    start = perf_counter()
+    asyncio.run(MATCH_INDEX.ready())
+    build = perf_counter() - start
+    start = perf_counter()
+    MATCH_INDEX.path = None
+    asyncio.run(MATCH_INDEX.ready())
+    load = perf_counter() - start
+    friend = perf_counter()
+    MATCH_INDEX.summary(targets[0], CONF.GameMode.ARAM)
+    friend = perf_counter() - friend
+    size = CONF.MATCH_FILE.stat().st_size / 1024 / 1024
+    print(f"records={records} file={size:.1f} MiB")
+    print(f"build index       {build * 1000:10.3f} ms")
+    print(f"load index        {load * 1000:10.3f} ms")
+    print(f"summary           {measure(summary, 3) / len(targets) * 1000:10.3f} ms/player")
+    print(f"summary (friend)  {friend * 1000:10.3f} ms")
+    print(f"records lookup    {measure(lookup, 3) / len(targets) * 1000:10.3f} ms/player")
+    start = perf_counter()
+    scan()
+    print(f"full scan         {(perf_counter() - start) * 1000:10.3f} ms/player")
+    directory.cleanup()
+
+
+def stats_api_load(connections: int, seconds: float = 3):
+    """多个keep-alive连接持续请求本地战绩接口，一半请求带If-None-Match，统计每秒请求数"""
+
+    async def worker(port: int, paths: list[str], deadline: float) -> int:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        etags: dict[str, str] = {}
+        count = 0
+        while perf_counter() < deadline:
+            path = paths[count % len(paths)]
+            header = f"If-None-Match: {etags[path]}\r\n" if count % 2 and path in etags else ""
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n{header}\r\n".encode())
+            head = (await reader.readuntil(b"\r\n\r\n")).decode()
+            length = 0
+            for line in head.split("\r\n"):
+                name, _, value = line.partition(": ")
+                if name == "Content-Length":
+                    length = int(value)
+                elif name == "ETag":
+                    etags[path] = value
+            await reader.readexactly(length)
+            count += 1
+        writer.close()
+        return count
+
+    async def run():
+        data = FakeData(seed=9)
+        client = FakeLcuClient(data)
+        for puuid in data.puuids[:5]:
+            await client.calculate_summoner_score(puuid)
+        client.champ_select = data.champ_select_session()
+        server = StatsServer(port=0)
+        server.add_client(client)
+        await server.start()
+        paths = [f"/clients/{client.port}/{name}" for name in ("teammates", "champ-select")]
+        paths.append("/clients")
+
+        async def update():
+            # 模拟英雄选择期间每100ms一次会话更新
+            while True:
+                await asyncio.sleep(0.1)
+                client.notify("champ-select")
+
+        updater = asyncio.create_task(update())
+        start = perf_counter()
+        counts = await asyncio.gather(
+            *[worker(server.port, paths, start + seconds) for _ in range(connections)]
+        )
+        elapsed = perf_counter() - start
+        updater.cancel()
+        await server.close()
+        return sum(counts), elapsed
+
+    total, elapsed = asyncio.run(run())
+    print(
+        f"connections={connections} requests={total} "
+        f"throughput={total / elapsed:.0f} req/s (client and server in one process)"
+    )
+
+
+def summoner_requests(games: int):
+    """模拟连续多局英雄选择，比较逐个查询和批量查询召唤师名称的请求次数
+
+    每局队伍中有2名固定的好友，其余2名从玩家池中随机选择，restart为True时每局前模拟一次重启。
+    """
+
+    async def run(batch: bool, persistent: bool, restart: bool) -> list[int]:
+        data = FakeData(seed=10, players=200)
+        rng = random.Random(10)
+        directory = tempfile.TemporaryDirectory()
+        SUMMONER_CACHE.path = Path(directory.name) / "summoners.json" if persistent else None
+        SUMMONER_CACHE.clear()
+        SUMMONER_CACHE.save()
+        counts = []
+        for _ in range(games):
+            if restart:
+                # 重启后内存中的缓存失效，持久化的缓存重新从文件读取
+                SUMMONER_CACHE._data = None
+            client = FakeLcuClient(data)
+            client.resolver.batch_supported = batch
+            team = [client.puuid, *data.puuids[1:3], *rng.sample(data.puuids[3:], 2)]
+            await asyncio.gather(*[client.get_summoner_name(puuid) for puuid in team])
+            counts.append(
+                sum(1 for _, api in client.requests if api.startswith("/lol-summoner/"))
+            )
+        SUMMONER_CACHE.path = None
+        directory.cleanup()
+        return counts
+
+    for name, batch, persistent in [
+        ("per-puuid, memory cache", False, False),
+        ("batched, persistent cache", True, True),
+    ]:
+        for restart in (False, True):
+            counts = asyncio.run(run(batch, persistent, restart))
+            print(
+                f"{name:28} restart={restart!s:5} "
+                f"{sum(counts) / games:5.2f} requests per champ select"
+            )
+
+
+# 启动时不应导入的模块
+HEAVY_MODULES = ["httpx", "websockets", "psutil", "helper.lcu"]
+IMPORT_SCRIPT = f"""
+import sys, time
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+"""
+WINDOW_SCRIPT = """
+import main
+from helper import config
+ui = main.UI(lambda: None)
+# 英雄列表文件应在窗口显示后读取
+print("AUTO_PICKS" in vars(config), flush=True)
+ui.update()
+print("shown", flush=True)
+ui.destroy()
+"""
+
+
+def startup(repeat: int, import_budget: float, window_budget: float) -> bool:
+    """测量main.py的导入耗时和从启动解释器到显示窗口的耗时，超出预算时返回False"""
+
+    ok = True
+    import_times = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT], cwd=ROOT, capture_output=True, text=True
+        ).stdout.split("\n")
+        import_times.append(float(output[0]))
+        if output[1]:
+            print(f"heavy modules imported at startup: {output[1]}")
+            ok = False
+    import_time = median(import_times)
+    ok &= import_time <= import_budget
+    print(f"import main       {import_time * 1000:8.1f} ms  (budget {import_budget * 1000:.0f} ms)")
+
+    window_times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-c", WINDOW_SCRIPT], cwd=ROOT, capture_output=True, text=True
+        )
+        if "shown" not in proc.stdout:
+            print(f"time to window    skipped: {proc.stderr.strip().splitlines()[-1]}")
+            return ok
+        if proc.stdout.startswith("True"):
+            print("AUTO_PICKS loaded before the window was shown")
+            ok = False
+        window_times.append(perf_counter() - start)
+    window_time = median(window_times)
+    ok &= window_time <= window_budget
+    print(f"time to window    {window_time * 1000:8.1f} ms  (budget {window_budget * 1000:.0f} ms)")
+    return ok
+
+
+def measure(func: Callable[[], None], repeat: int, min_time: float = 0.2) -> float:
+    """返回多轮测量中单次执行耗时的中位数(秒)"""
+
+    func()  # 预热
+    number = 1
+    while True:
+        start = perf_counter()
+        for _ in range(number):
+            func()
+        if (elapsed := perf_counter() - start) >= min_time or number >= 1 << 16:
+            break
+        number *= 2
+    results = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = perf_counter()
+        for _ in range(number):
+            func()
+        results.append((perf_counter() - start) / number)
+    return median(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LcuClient性能基准测试")
+    parser.add_argument("filter", nargs="*", help="只运行名称包含指定字符串的用例")
+    parser.add_argument("-s", "--size", type=int, default=1, help="数据规模倍数")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("-t", "--threshold", type=float, default=0.2, help="允许的变慢比例")
+    parser.add_argument("-b", "--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save", action="store_true", help="保存结果为新的基准")
+    parser.add_argument(
+        "--overhead", type=lambda x: [int(i) for i in x.split(",")], help="如1,10,100"
+    )
+    parser.add_argument("--accept", type=int, metavar="N", help="测量N次接受对局的延迟分布")
+    parser.add_argument("--lookup", type=int, metavar="N", help="在N局记录中比较索引和全量扫描")
+    parser.add_argument("--stats-api", type=int, metavar="N", help="使用N个连接测试战绩接口")
+    parser.add_argument("--summoners", type=int, metavar="N", help="N局中查询召唤师的请求次数")
+    parser.add_argument("--startup", action="store_true", help="测量启动耗时")
+    parser.add_argument("--import-budget", type=float, default=0.15, help="导入耗时预算(秒)")
+    parser.add_argument("--window-budget", type=float, default=1.0, help="显示窗口耗时预算(秒)")
+    args = parser.parse_args()
+
+    logger.remove()
+    CONF.PREFETCH = False
+    CONF.SAVE_MATCH = False
+    CONF.SUMMONER_BATCH_WINDOW = 0
+    SUMMONER_CACHE.path = None
+    # 战绩分析会加载比赛记录索引，使用空的临时目录，结果不受本地数据影响，也不写入索引文件
+    directory = tempfile.TemporaryDirectory()
+    CONF.MATCH_FILE = Path(directory.name) / "matches.txt"
+    if args.overhead:
+        client_overhead(args.overhead)
+        return
+    if args.accept:
+        accept_latency(args.accept)
+        return
+    if args.lookup:
+        match_lookup(args.lookup)
+        return
+    if args.stats_api:
+        stats_api_load(args.stats_api)
+        return
+    if args.summoners:
+        summoner_requests(args.summoners)
+        return
+    if args.startup:
+        if not startup(args.repeat, args.import_budget, args.window_budget):
+            print("Startup over budget")
+            exit(1)
+        return
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.is_file() else {}
+    results, regressions = {}, []
+
+    for name, builder in CASES.items():
+        if args.filter and not any(keyword in name for keyword in args.filter):
+            continue
+        key = f"{name}[size={args.size}]"
+        if (func := builder(args.size)) is None:
+            print(f"{key:40} skipped")
+            continue
+        results[key] = seconds = measure(func, args.repeat)
+        line = f"{key:40} {seconds * 1000:10.3f} ms"
+        if (base := baseline.get(key)) is not None:
+            change = seconds / base - 1
+            line += f"  {change:+7.1%}"
+            if change > args.threshold:
+                line += "  REGRESSION"
+                regressions.append(key)
+        print(line)
+
+    if args.save:
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2))
+        print(f"Save baseline to {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""生成确定性的模拟LCU数据，用于基准测试和离线调试
+
+FakeData 根据随机种子生成比赛记录、比赛详情、英雄选择会话和GameFlow事件，
+FakeLcuClient 使用这些数据响应 LcuClient 的所有请求，FakeLcuServer 在本地模拟客户端的
+WebSocket推送，无需启动游戏客户端。
+"""
+
+import asyncio
+import json
+import math
+import random
+import re
+import ssl
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+
+from httpx import AsyncClient, MockTransport, Request, Response
+from websockets.asyncio.server import Server, ServerConnection, serve
+from websockets.exceptions import ConnectionClosed
+
+from helper import config as CONF
+from helper.config import Route
+from helper.lcu import LcuClient
+from helper.scheduler import RequestScheduler
+
+START_TIME = 1_700_000_000_000  # 比赛创建时间的起点(毫秒)
+MODES = [CONF.GameMode.ARAM] * 4 + [CONF.GameMode.CLASSIC]
+
+
+class FakeData:
+    """根据种子生成模拟的LCU数据，相同的种子和参数总是生成相同的数据"""
+
+    def __init__(self, seed: int = 0, players: int = 50, champions: int = 160):
+        self.seed = seed
+        self.puuids = [f"puuid-{seed}-{i:04}" for i in range(players)]
+        self.champions = list(range(1, champions + 1))
+
+    def rng(self, *key) -> random.Random:
+        """每组数据使用独立的随机数生成器，保证与生成顺序无关"""
+
+        return random.Random(f"{self.seed}:{':'.join(map(str, key))}")
+
+    def summoner(self, puuid: str) -> dict:
+        index = self.puuids.index(puuid) if puuid in self.puuids else 0
+        return {
+            "gameName": f"召唤师{index}",
+            "puuid": puuid,
+            "summonerId": 10_000 + index,
+            "rerollPoints": {"numberOfRolls": 2},
+        }
+
+    def stats(self, rng: random.Random, win: bool) -> dict:
+        stats = {item: rng.randint(0, 20) for item in CONF.SAVE_ITEM}
+        stats.update(
+            win=win,
+            firstBloodKill=rng.random() < 0.1,
+            totalDamageDealtToChampions=rng.randint(5_000, 60_000),
+            totalDamageDealt=rng.randint(50_000, 200_000),
+            totalDamageTaken=rng.randint(10_000, 50_000),
+            goldEarned=rng.randint(6_000, 20_000),
+            champLevel=rng.randint(12, 18),
+        )
+        return stats
+
+    def match(self, puuid: str, index: int) -> dict:
+        """指定玩家的第index场比赛(0为最近一场)，participants[0]为该玩家"""
+
+        rng = self.rng("match", puuid, index)
+        win = rng.random() < 0.5
+        return {
+            "gameId": 7_000_000_000 + rng.randrange(1_000_000_000),
+            "gameCreation": START_TIME - index * 1_800_000 - rng.randint(0, 600_000),
+            "gameDuration": rng.randint(900, 1_500),
+            "gameMode": rng.choice(MODES),
+            "participants": [
+                {
+                    "championId": rng.choice(self.champions),
+                    "teamId": rng.choice([100, 200]),
+                    "stats": self.stats(rng, win),
+                }
+            ],
+            "participantIdentities": [{"player": {"puuid": puuid}}],
+        }
+
+    def match_history(self, puuid: str, begin: int = 0, end: int = 20) -> dict:
+        """与 Route.MatchList 格式相同的比赛记录分页，页内按时间顺序排列"""
+
+        return {"games": {"games": [self.match(puuid, i) for i in reversed(range(begin, end))]}}
+
+    def match_detail(self, game_id: int) -> dict:
+        """与 Route.MatchDetail 格式相同的比赛详情，包含十名玩家"""
+
+        rng = self.rng("detail", game_id)
+        puuids = rng.sample(self.puuids, min(10, len(self.puuids)))
+        win = rng.random() < 0.5
+        return {
+            "gameId": game_id,
+            "gameCreation": START_TIME - rng.randint(0, 10**9),
+            "gameDuration": rng.randint(900, 1_500),
+            "gameMode": CONF.GameMode.ARAM,
+            "participants": [
+                {
+                    "participantId": i + 1,
+                    "championId": rng.choice(self.champions),
+                    "teamId": 100 if i < 5 else 200,
+                    "stats": self.stats(rng, win == (i < 5)),
+                }
+                for i in range(len(puuids))
+            ],
+            "participantIdentities": [
+                {"participantId": i + 1, "player": {"puuid": puuid}}
+                for i, puuid in enumerate(puuids)
+            ],
+        }
+
+    def champ_select_session(self, local: int = 0, bench: bool = True, index: int = 0) -> dict:
+        """与 Route.BpSession 格式相同的英雄选择会话，local为当前召唤师的位置"""
+
+        rng = self.rng("session", local, bench, index)
+        team = [
+            {
+                "cellId": i,
+                "puuid": self.puuids[i],
+                "summonerId": 10_000 + i,
+                "championId": rng.choice(self.champions),
+            }
+            for i in range(5)
+        ]
+        return {
+            "benchEnabled": bench,
+            "benchChampions": [
+                {"championId": champion} for champion in rng.sample(self.champions, 10)
+            ]
+            if bench
+            else [],
+            "myTeam": team,
+            "localPlayerCellId": local,
+            "actions": [
+                [
+                    {
+                        "id": i,
+                        "actorCellId": i,
+                        "type": "pick",
+                        "isInProgress": i == local,
+                        "completed": False,
+                    }
+                    for i in range(5)
+                ]
+            ],
+        }
+
+    def gameflow_session(self, mode: str = CONF.GameMode.ARAM) -> dict:
+        """与 Route.Session 格式相同的房间信息"""
+
+        return {
+            "map": {"gameMode": mode},
+            "gameData": {
+                "teamOne": [{"puuid": puuid} for puuid in self.puuids[:5]],
+                "teamTwo": [{"puuid": puuid} for puuid in self.puuids[5:10]],
+            },
+        }
+
+    @staticmethod
+    def ws_frame(uri: str, data, event_type: str = "Update") -> str:
+        """与客户端WebSocket推送格式相同的消息"""
+
+        return json.dumps(
+            [8, "OnJsonApiEvent", {"uri": uri, "eventType": event_type, "data": data}],
+            ensure_ascii=False,
+        )
+
+    def ready_check(self, state: str = "InProgress", response: str = "None") -> str:
+        """准备确认状态变化的WebSocket消息"""
+
+        return self.ws_frame(
+            Route.ReadyCheck, {"state": state, "playerResponse": response, "timer": 3.0}
+        )
+
+    def gameflow_events(self, games: int = 1, session_updates: int = 10) -> list[str]:
+        """完整对局流程的WebSocket消息，每局包含若干次英雄选择会话更新"""
+
+        frames = []
+        for game in range(games):
+            for phase in ["Lobby", "Matchmaking", "ReadyCheck", "ChampSelect"]:
+                frames.append(self.ws_frame(Route.GameFlow, phase))
+                if phase == "ReadyCheck":
+                    frames.append(self.ready_check())
+            for i in range(session_updates):
+                frames.append(
+                    self.ws_frame(Route.BpSession, self.champ_select_session(index=game * 1000 + i))
+                )
+            for phase in ["GameStart", "InProgress", "PreEndOfGame", "EndOfGame"]:
+                frames.append(self.ws_frame(Route.GameFlow, phase))
+        return frames
+
+
+class FakeLcuClient(LcuClient):
+    """通过 MockTransport 使用 FakeData 响应所有请求的客户端，请求仍经过调度器
+
+    Args:
+        data: 模拟数据
+        latency: 每个请求的模拟延迟(秒)
+        throttle: 是否使用默认的请求速率限制，否则只测量处理耗时
+        failures: 各接口返回500的概率
+    """
+
+    def __init__(
+        self,
+        data: Optional[FakeData] = None,
+        latency: float = 0,
+        port: str = "0",
+        throttle: bool = False,
+        failures: Optional[dict[Route, float]] = None,
+    ):
+        super().__init__(token="fake", port=port)
+        if not throttle:
+            self.scheduler = RequestScheduler(
+                concurrency=1024, rate=math.inf, min_rate=math.inf, max_rate=math.inf
+            )
+        self.data = data or FakeData()
+        self.latency = latency
+        self.failures = failures or {}
+        self.rng = self.data.rng("failures", port)
+        self.requests: list[tuple[str, str]] = []
+        self.puuid = self.data.puuids[0]
+        self.summoner_id = 10_000
+        self.name = "召唤师0"
+        self.rolls = 2
+        self.routes = [
+            (re.compile(re.sub(r"\\{(\w+)\\}", r"(?P<\1>[^/?&]+)", re.escape(route))), route)
+            for route in Route
+        ]
+        self.client = AsyncClient(base_url=self.base_url, transport=MockTransport(self.handle))
+
+    async def handle(self, request: Request) -> Response:
+        api = request.url.raw_path.decode()
+        self.requests.append((request.method, api))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for pattern, route in self.routes:
+            if match := pattern.fullmatch(api):
+                if self.rng.random() < self.failures.get(route, 0):
+                    return Response(500, json={"errorCode": "RPC_ERROR"})
+                body = json.loads(request.content) if request.content else None
+                data = self.respond(request.method, route, body, **match.groupdict())
+                return Response(200, json=data) if data else Response(204)
+        return Response(404, json={"errorCode": "RESOURCE_NOT_FOUND"})
+
+    def respond(self, method: str, route: Route, body=None, **params) -> dict:
+        data = self.data
+        match route:
+            case Route.CurrentSummoner:
+                return data.summoner(self.puuid)
+            case Route.Summoner:
+                return data.summoner(params["puuid"])
+            case Route.SummonersByPuuid if method == "POST":
+                return [data.summoner(puuid) for puuid in body]  # type: ignore
+            case Route.MatchList:
+                return data.match_history(
+                    params["puuid"], int(params["begIdx"]), int(params["endIdx"])
+                )
+            case Route.MatchDetail:
+                return data.match_detail(int(params["gameId"]))
+            case Route.Session:
+                return data.gameflow_session()
+            case Route.LobbyMembers:
+                return [{"puuid": puuid} for puuid in data.puuids[:5]]  # type: ignore
+            case Route.Conversations:
+                return [{"type": "championSelect", "id": "champ-select"}]  # type: ignore
+            case Route.ChatInfo if method == "GET":
+                return [  # type: ignore
+                    {"fromId": puuid, "body": "joined_room", "type": "system"}
+                    for puuid in data.puuids[:5]
+                ]
+            case Route.Champions:
+                return {"name": f"英雄{params['id']}", "title": "称号"}
+            case Route.BpSession:
+                return data.champ_select_session()
+        return {}
+
+
+class FakeLcuServer:
+    """本地的wss服务，模拟一个客户端的WebSocket推送
+
+    连接并收到订阅消息后依次发送frames，之后停止监听并断开连接，模拟客户端退出：
+    LcuClient重新连接时被拒绝，监听任务随之结束。HTTP请求仍由 FakeLcuClient 响应。
+
+    Args:
+        frames: 推送的WebSocket消息
+        ssl_context: 服务端证书，可由 self_signed_context 生成
+    """
+
+    def __init__(self, frames: list[str], ssl_context: ssl.SSLContext):
+        self.frames = frames
+        self.ssl_context = ssl_context
+        self.server: Optional[Server] = None
+        self.port = ""
+        self.running = False
+
+    @staticmethod
+    def self_signed_context() -> Optional[ssl.SSLContext]:
+        """使用openssl生成127.0.0.1的自签名证书，没有openssl时返回None"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            cert, key = Path(directory, "cert.pem"), Path(directory, "key.pem")
+            command = ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1"]
+            command += ["-subj", "/CN=127.0.0.1", "-keyout", str(key), "-out", str(cert)]
+            try:
+                subprocess.run(command, check=True, capture_output=True)
+            except (OSError, subprocess.CalledProcessError):
+                return None
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(cert, key)
+        return context
+
+    async def start(self):
+        self.server = await serve(self.handle, "127.0.0.1", 0, ssl=self.ssl_context)
+        self.port = str(self.server.sockets[0].getsockname()[1])
+        self.running = True
+
+    async def handle(self, socket: ServerConnection):
+        try:
+            # LcuClient连接后订阅三个事件
+            for _ in range(3):
+                await socket.recv()
+            for frame in self.frames:
+                await socket.send(frame)
+        except ConnectionClosed:
+            pass
+        self.running = False
+        self.server.close(close_connections=False)  # type: ignore
+        # 非正常关闭，LcuClient会尝试重新连接
+        await socket.close(1011, "client exit")
+
+    async def wait_closed(self):
+        if self.server is not None:
+            await self.server.wait_closed()
@@ -2,13 +2,20 @@ import asyncio
 import json
 import sys
 from pathlib import Path
-from typing import TypedDict
+from typing import Optional, TypedDict
 
 ROOT = Path(__file__).parent.parent
 DATA_DIR = ROOT / "data"
 sys.path.append(str(ROOT))
 
+from httpx import HTTPStatusError
+
+from helper.cache import MATCH_DETAIL_CACHE
 from helper.lcu import LcuClient
+from helper.scheduler import RetryPolicy
+
+# 比赛详情和空的比赛记录多为客户端暂未加载完成，等待更久后重试
+CRAWLER_POLICY = RetryPolicy(attempts=5, base_delay=0.5, max_delay=4)
 
 COLUMNS = [
     "assists",
@@ -36,7 +43,7 @@ COLUMNS = [
 
 class MemberMatches(TypedDict):
     puuid: str  # 玩家id
-    matches: list[dict]  # 最近20场游戏数据
+    game_ids: list[int]  # 最近20场游戏id，数据保存在GameStore中
 
 
 class MatchData(TypedDict):
@@ -46,7 +53,42 @@ class MatchData(TypedDict):
     members_data: list[MemberMatches]  # 己方队伍五位玩家的近20场游戏数据
 
 
-def load_matches_data(filename: str) -> list[MatchData]:
+class StoredGame(TypedDict):
+    creation: int
+    duration: int
+    ARAM: bool
+    players: dict[str, dict]  # puuid -> COLUMNS中的数据
+
+
+class GameStore:
+    """所有队伍成员共享的比赛数据，每场比赛只保存一次，每位玩家在该场的数据只保存一次"""
+
+    def __init__(self, games: Optional[dict[str, StoredGame]] = None):
+        # json的键只能为字符串，gameId统一转换为字符串
+        self.games: dict[str, StoredGame] = games or {}
+
+    def add(self, puuid: str, match: dict) -> int:
+        """保存比赛记录中participants[0]的数据，返回gameId"""
+
+        game = self.games.setdefault(
+            str(match["gameId"]),
+            StoredGame(
+                creation=match["gameCreation"],
+                duration=match["gameDuration"],
+                ARAM=match["gameMode"] == "ARAM",
+                players={},
+            ),
+        )
+        if puuid not in game["players"]:
+            stats = match["participants"][0]["stats"]
+            game["players"][puuid] = {column: stats[column] for column in COLUMNS}
+        return match["gameId"]
+
+    def records(self) -> int:
+        return sum(len(game["players"]) for game in self.games.values())
+
+
+def load_matches_data(filename: str) -> tuple[list[MatchData], GameStore]:
     _filename = DATA_DIR / filename
     if not _filename.is_file():
         print(f"File {_filename} not found")
@@ -54,14 +96,17 @@ def load_matches_data(filename: str) -> list[MatchData]:
 
     with _filename.open() as f:
         data = json.load(f)
-        print(f"Load matches_data from {_filename}")
-        return data
+    if isinstance(data, list):
+        print(f"{_filename} uses the old format without game store, please get it again")
+        exit()
+    print(f"Load matches_data from {_filename}")
+    return data["matches"], GameStore(data["games"])
 
 
-def save_matches_data(filename: str, data: list[MatchData]):
+def save_matches_data(filename: str, data: list[MatchData], store: GameStore):
     _filename = DATA_DIR / filename
     with _filename.open("w", encoding="utf8") as f:
-        json.dump(data, f, ensure_ascii=False)
+        json.dump({"games": store.games, "matches": data}, f, ensure_ascii=False)
         print(f"Save matches_data to {_filename}")
 
 
@@ -89,6 +134,30 @@ def bin_search(matches, game_creation: int) -> int:
 
 
 class MatchGetter(LcuClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.store = GameStore()
+        # puuid -> {比赛记录中的位置: 比赛}，成员的比赛窗口互相重叠时不再重复请求
+        self.histories: dict[str, dict[int, dict]] = {}
+        self.history_requests = self.history_saved = 0
+
+    async def get_history_page(self, puuid: str, begin_index: int) -> list[dict]:
+        """获取从begin_index开始的20场比赛记录，已经请求过的位置直接使用缓存"""
+
+        positions = self.histories.setdefault(puuid, {})
+        indexes = range(begin_index, begin_index + 20)
+        if begin_index >= 0 and all(i in positions for i in indexes):
+            self.history_saved += 1
+            # 与接口一致，页内按时间顺序排列
+            return [positions[i] for i in reversed(indexes)]
+
+        self.history_requests += 1
+        matches = await self.get_match_history(puuid, begin_index, policy=CRAWLER_POLICY)
+        if begin_index >= 0:
+            for offset, match in enumerate(reversed(matches)):
+                positions[begin_index + offset] = match
+        return matches
+
     async def get_members(self, game_id: int, team_id: int) -> list[str]:
         """根据比赛id获取己方玩家id
 
@@ -98,11 +167,13 @@ class MatchGetter(LcuClient):
         Returns:
             members: 己方玩家id列表
         """
-        while True:
-            detail = await self.get_match_detail(str(game_id))
-            if not detail.get("errorCode"):
-                break
-            await asyncio.sleep(0.5)
+        try:
+            detail = await self.get_match_detail(str(game_id), policy=CRAWLER_POLICY)
+        except HTTPStatusError:
+            detail = {}
+        if not detail.get("participantIdentities"):
+            print(f"\nFailed to get match detail: {game_id}")
+            return []
         member_id_start = 0 if team_id == 100 else 5
         return [
             member["player"]["puuid"]
@@ -123,38 +194,40 @@ class MatchGetter(LcuClient):
         """
         print("Start get matches data")
         if filename and (DATA_DIR / filename).is_file():
-            return load_matches_data(filename)
+            matches_data, self.store = load_matches_data(filename)
+            return matches_data
 
         matches_data = []
         end = start_idx + nums
         while start_idx < end or nums == 0:
-            count = 0
-            while not (matches := await self.get_match_history(self.puuid, begin_index=start_idx)):
-                count += 1
-                if count >= 3:
-                    break
-                await asyncio.sleep(0.5)
-
+            matches = await self.get_history_page(self.puuid, start_idx)
             if not matches:
                 print("\nNo more matches")
                 break
 
             start_idx += len(matches)
 
-            for match in reversed(matches):
-                if len(matches_data) >= nums and nums != 0:
-                    break
-                if match["gameMode"] != "ARAM":
+            aram_matches = [match for match in reversed(matches) if match["gameMode"] == "ARAM"]
+            if nums != 0:
+                aram_matches = aram_matches[: nums - len(matches_data)]
+            # 同一页的比赛详情由调度器控制并发
+            members_list = await asyncio.gather(
+                *[
+                    self.get_members(match["gameId"], match["participants"][0]["teamId"])
+                    for match in aram_matches
+                ]
+            )
+            for match, members in zip(aram_matches, members_list):
+                if not members:
                     continue
                 summoner = match["participants"][0]
-                members = await self.get_members(match["gameId"], summoner["teamId"])
                 matches_data.append(
                     MatchData(
                         match_id=match["gameId"],
                         creation=match["gameCreation"],
                         win=summoner["stats"]["win"],
                         members_data=[
-                            MemberMatches(puuid=member, matches=[]) for member in members
+                            MemberMatches(puuid=member, game_ids=[]) for member in members
                         ],
                     )
                 )
@@ -165,7 +238,7 @@ class MatchGetter(LcuClient):
         print(f"\nTotal get{len(matches_data):4}/{start_idx}/{end}")
 
         if filename:
-            save_matches_data(filename, matches_data)
+            save_matches_data(filename, matches_data, self.store)
 
         return matches_data
 
@@ -181,32 +254,38 @@ class MatchGetter(LcuClient):
         """
         print("Start get matches detail")
         if filename and not matches_data:
-            matches_data = load_matches_data(filename)
+            matches_data, self.store = load_matches_data(filename)
 
         for i, match in enumerate(matches_data):
             print(f"Getting match [{i + 1}/{len(matches_data)}] ...", end="\r")
 
-            if (
-                len([member["matches"] for member in match["members_data"] if member["matches"]])
-                == 5
-            ):
+            if all(member["game_ids"] for member in match["members_data"]):
                 continue
 
             try:
-                for i, member in enumerate(match["members_data"]):
-                    if not member["matches"]:
-                        match["members_data"][i] = await self.get_member_matches(
+                missing = [
+                    i for i, member in enumerate(match["members_data"]) if not member["game_ids"]
+                ]
+                results = await asyncio.gather(
+                    *[
+                        self.get_member_matches(
                             game_creation=match["creation"],
                             start_idx=i,
-                            puuid=member["puuid"],
+                            puuid=match["members_data"][i]["puuid"],
                         )
+                        for i in missing
+                    ]
+                )
+                for i, result in zip(missing, results):
+                    match["members_data"][i] = result
             except KeyboardInterrupt:
                 print("\nKeyboardInterrupt, exit")
                 break
             except Exception as e:
                 print(e)
 
-        save_matches_data(filename, matches_data)
+        if filename:
+            save_matches_data(filename, matches_data, self.store)
         return matches_data
 
     async def get_member_matches(
@@ -221,17 +300,14 @@ class MatchGetter(LcuClient):
             start_idx: 获取比赛记录的起始位置
             puuid: 召唤师id
         Returns:
-            match_data: 比赛数据
+            match_data: 比赛数据，比赛记录保存在GameStore中
         """
         while True:
             if start_idx < 0:
                 break
-            count = 0
-            while not (matches := await self.get_match_history(puuid, start_idx)):
-                count += 1
-                if count >= 3:
-                    return MemberMatches(puuid=puuid, matches=[])
-                await asyncio.sleep(0.5)
+            matches = await self.get_history_page(puuid, start_idx)
+            if not matches:
+                return MemberMatches(puuid=puuid, game_ids=[])
 
             if matches[-1]["gameCreation"] < game_creation:
                 start_idx -= len(matches)
@@ -241,20 +317,27 @@ class MatchGetter(LcuClient):
                 start_idx += bin_search(matches, game_creation)
                 break
 
-        matches = await self.get_match_history(puuid, start_idx)
-
-        for i, match in enumerate(matches):
-            match_data = {column: match["participants"][0]["stats"][column] for column in COLUMNS}
-            match_data.update(
-                {
-                    "creation": match["gameCreation"],
-                    "duration": match["gameDuration"],
-                    "ARAM": match["gameMode"] == "ARAM",
-                }
-            )
-            matches[i] = match_data
-
-        return MemberMatches(puuid=puuid, matches=matches)
+        matches = await self.get_history_page(puuid, start_idx)
+        return MemberMatches(
+            puuid=puuid, game_ids=[self.store.add(puuid, match) for match in matches]
+        )
+
+    def report(self, matches_data: list[MatchData]):
+        """统计去重效果：窗口引用的比赛数与实际保存的数据量，以及节省的请求数"""
+
+        refs = sum(
+            len(member["game_ids"]) for match in matches_data for member in match["members_data"]
+        )
+        records = self.store.records()
+        total = self.history_requests + self.history_saved
+        print(
+            f"Game store: {len(self.store.games)} games, {records} player records "
+            f"for {refs} window references ({refs / (records or 1):.2f}x dedup)"
+        )
+        print(
+            f"History pages: {self.history_requests} requested, {self.history_saved} reused "
+            f"({self.history_saved / (total or 1):.0%} saved)"
+        )
 
     async def run(self, start: int, nums: int = 0, save: bool = True):
         """入口函数
@@ -269,7 +352,13 @@ class MatchGetter(LcuClient):
         await self.get_summoner_info()
         filename = f"{start}-{start + nums}_matches_data.json" if save else ""
         matches_data = await self.get_matches_list(nums=nums, filename=filename)
-        return await self.get_matches_detail(matches_data, filename)
+        matches_data = await self.get_matches_detail(matches_data, filename)
+        self.report(matches_data)
+        print("Request statistics:")
+        for route, stats in self.scheduler.stats().items():
+            print(f"  {route}: {stats}")
+        print(f"Match detail cache: {MATCH_DETAIL_CACHE.stats()}")
+        return matches_data
 
 
 if __name__ == "__main__":
@@ -0,0 +1,201 @@
+"""回放 CONF.RECORD_SESSION 记录的客户端会话，用于离线分析 handle_ws_response 的性能
+
+WebSocket消息按记录时间依次交给 LcuClient.handle_ws_response 处理，HTTP请求使用记录的响应应答。
+
+用法：
+    python scripts/replay.py records/20240101-200000-12345.jsonl.gz --speed max
+    python scripts/replay.py record.jsonl.gz --speed 10 --profile replay.prof
+    python scripts/replay.py record.jsonl.gz --trace trace.json
+"""
+
+import argparse
+import asyncio
+import cProfile
+import json
+import math
+import sys
+import tempfile
+from collections import defaultdict, deque
+from pathlib import Path
+from statistics import median
+from time import perf_counter
+from typing import Optional
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+
+from httpx import AsyncClient, MockTransport, Request, Response
+from loguru import logger
+
+from helper import config as CONF
+from helper.cache import HISTORY_CACHE, MATCH_DETAIL_CACHE, SUMMONER_CACHE
+from helper.config import Route
+from helper.exceptions import HelperException
+from helper.lcu import LcuClient
+from helper.recorder import load_records
+from helper.scheduler import RequestScheduler
+
+
+class ReplayClient(LcuClient):
+    """按记录顺序返回相同请求的响应，记录用尽后重复最后一次响应
+
+    召唤师查询按时间窗口合并为批量请求，回放速度不同时批次的组成与记录不同，
+    因此召唤师信息按puuid从记录的所有召唤师响应中查找，与请求的批次无关。
+    """
+
+    def __init__(self, responses: dict[tuple[str, str], deque]):
+        super().__init__(token="replay", port="0")
+        self.responses = responses
+        self.missing: set[tuple[str, str]] = set()
+        self.summoners = self.collect_summoners(responses)
+        self.client = AsyncClient(base_url=self.base_url, transport=MockTransport(self.handle))
+        self.scheduler = RequestScheduler(
+            concurrency=1024, rate=math.inf, min_rate=math.inf, max_rate=math.inf
+        )
+
+    @staticmethod
+    def collect_summoners(responses: dict[tuple[str, str], deque]) -> dict[str, dict]:
+        """记录中单个和批量查询返回的所有召唤师，键为puuid"""
+
+        prefix = Route.Summoner.format(puuid="")
+        summoners = {}
+        for (method, api), queue in responses.items():
+            if not (api.startswith(prefix) or (method, api) == ("POST", Route.SummonersByPuuid)):
+                continue
+            for status, body in queue:
+                if status == 200:
+                    data = json.loads(body)
+                    for summoner in data if isinstance(data, list) else [data]:
+                        summoners[summoner["puuid"]] = summoner
+        return summoners
+
+    def handle_summoners(self, request: Request, api: str) -> Optional[Response]:
+        if request.method == "POST" and api == Route.SummonersByPuuid:
+            puuids = json.loads(request.content)
+            # 未记录的召唤师不返回，由LcuClient逐个查询
+            return Response(
+                200, json=[self.summoners[puuid] for puuid in puuids if puuid in self.summoners]
+            )
+        prefix = Route.Summoner.format(puuid="")
+        if request.method == "GET" and api.startswith(prefix):
+            if (summoner := self.summoners.get(api.removeprefix(prefix))) is not None:
+                return Response(200, json=summoner)
+        return None
+
+    def handle(self, request: Request) -> Response:
+        key = (request.method, request.url.raw_path.decode())
+        if (response := self.handle_summoners(request, key[1])) is not None:
+            return response
+        if not (queue := self.responses.get(key)):
+            self.missing.add(key)
+            return Response(404, json={"errorCode": "NOT_RECORDED"})
+        status, body = queue.popleft() if len(queue) > 1 else queue[0]
+        return Response(status, content=body.encode("utf8"))
+
+
+def load(path: Path) -> tuple[list[tuple[float, str]], dict[tuple[str, str], deque]]:
+    frames, responses = [], defaultdict(deque)
+    for record in load_records(path):
+        if record[1] == "ws":
+            frames.append((record[0], record[2]))
+        else:
+            _, _, method, api, status, body = record
+            responses[(method, api)].append((status, body))
+    return frames, responses
+
+
+async def replay(
+    client: ReplayClient, frames: list[tuple[float, str]], speed: float
+) -> list[float]:
+    """按speed倍速回放消息，speed为inf时不等待，返回每条消息的处理耗时"""
+
+    durations = []
+    start = perf_counter()
+    for offset, frame in frames:
+        if speed != math.inf and (delay := offset / speed - (perf_counter() - start)) > 0:
+            await asyncio.sleep(delay)
+        begin = perf_counter()
+        try:
+            await client.handle_ws_response(frame)
+        except HelperException:
+            pass
+        durations.append(perf_counter() - begin)
+    # 等待后台任务(战绩分析、接受对局等)完成
+    if client._tasks:
+        await asyncio.gather(*client._tasks, return_exceptions=True)
+    return durations
+
+
+def isolate(directory: Path):
+    """回放时从空缓存开始，不读取也不修改用户的缓存和比赛记录，使每次回放的请求和耗时一致"""
+
+    HISTORY_CACHE.clear()
+    SUMMONER_CACHE.path = None
+    SUMMONER_CACHE.clear()
+    MATCH_DETAIL_CACHE.directory = directory / "matches"
+    MATCH_DETAIL_CACHE.hot.clear()
+    MATCH_DETAIL_CACHE._index = None
+    CONF.MATCH_FILE = directory / "matches.jsonl"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放记录的客户端会话")
+    parser.add_argument("record", type=Path)
+    parser.add_argument("-s", "--speed", default="1", help="回放倍速，如1(实时)、10，max表示不等待")
+    parser.add_argument("-p", "--profile", type=Path, help="保存cProfile结果")
+    parser.add_argument("-t", "--trace", type=Path, help="保存Chrome trace格式的耗时区间")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出处理日志")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logger.remove()
+    CONF.SAVE_MATCH = False
+    CONF.RECORD_SESSION = False
+    CONF.TRACE = args.trace is not None
+    speed = math.inf if args.speed == "max" else float(args.speed)
+    frames, responses = load(args.record)
+    temp = tempfile.TemporaryDirectory()
+    isolate(Path(temp.name))
+
+    async def run():
+        client = ReplayClient(responses)
+        if ("GET", Route.CurrentSummoner) in responses:
+            await client.get_summoner_info()
+        else:
+            client.name = client.puuid = client.summoner_id = ""
+            client.rolls = 0
+        durations = await replay(client, frames, speed)
+        if client.missing:
+            print(f"{len(client.missing)} requests not recorded, responded with 404")
+        if args.trace:
+            print(f"Save {client.tracer.dump(args.trace)} trace events to {args.trace}")
+        return durations
+
+    profiler = cProfile.Profile() if args.profile else None
+    start = perf_counter()
+    if profiler:
+        durations = profiler.runcall(asyncio.run, run())
+        profiler.dump_stats(args.profile)
+    else:
+        durations = asyncio.run(run())
+    elapsed = perf_counter() - start
+    temp.cleanup()
+
+    print(f"Replayed {len(frames)} frames in {elapsed:.3f}s at speed {args.speed}")
+    if not durations:
+        return
+    durations.sort()
+    handler_time = sum(durations)
+    print(
+        f"handler: total={handler_time * 1000:.1f}ms "
+        f"throughput={len(durations) / handler_time:.0f} frames/s "
+        f"p50={median(durations) * 1000:.3f}ms "
+        f"p99={durations[int(len(durations) * 0.99)] * 1000:.3f}ms "
+        f"max={durations[-1] * 1000:.3f}ms"
+    )
+    if args.profile:
+        print(f"Save profile to {args.profile}")
+
+
+if __name__ == "__main__":
+    main()